@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Unified command-line entry point for the Ruminococcaceae agent
+
+Usage:
+    python scripts/agent_cli.py <command> [args...]
+
+Each command's module is only imported when that command runs, so
+listing commands or checking the setup never loads anthropic,
+google.generativeai or pandas.
+"""
+
+import runpy
+import sys
+
+# command -> (module in scripts/, extra argv, description)
+COMMANDS = {
+    'setup': ('test_setup', [], "Check that API keys are configured"),
+    'models': ('check_gemini', [], "List available Gemini models"),
+    'agent-test': ('multi_ai_agent', [], "Run the multi-AI agent smoke test"),
+    'interactive': ('ruminococcaceae_analysis', ['interactive'], "Interactive analysis assistant"),
+    'example': ('ruminococcaceae_analysis', [], "Run the example analysis workflow"),
+    'batch': ('batch_interpretation', [], "Batch interpretation per genus/MAG (Message Batches)"),
+    'manifest': ('create_rumino_manifest', [], "Build the Ruminococcaceae MAG manifest"),
+    'evaluate': ('evaluate_project', [], "Evaluate scientific merit of the project"),
+    'plan': ('plan_comparative_analysis', [], "Plan comparative genomics with resources"),
+    'prioritize': ('prioritize_analysis', [], "Prioritize the minimum publishable analysis"),
+    'download-job': ('create_download_job', [], "Generate the SLURM genome download job"),
+    'smart-filter': ('smart_auto_download', [], "Inspect GTDB metadata and filter genomes"),
+    'faidx': ('fasta_index', [], "Index MAG/reference FASTA and fetch contig regions"),
+    'results': ('results_store', [], "Search stored answers; export/import results/*.txt reports"),
+    'report': ('agent_metrics', [], "Summarize latency/tokens from logs/agent_calls.jsonl"),
+    'bench-startup': ('benchmark_startup', [], "Benchmark cold-start time of the CLI"),
+    'bench': ('benchmark_suite', [], "Run the offline benchmark suite"),
+    'fake-llm': ('fake_llm_server', [], "Run the local fake Anthropic/Gemini server"),
+    'synthetic-data': ('synthetic_data', [], "Generate synthetic GTDB/CheckM/FASTA data"),
+}
+
+
+def print_usage():
+    """Print the list of available commands"""
+    print("Usage: python scripts/agent_cli.py <command> [args...]\n")
+    print("Commands:")
+    for name, (_, _, description) in COMMANDS.items():
+        print(f"  {name:<15} {description}")
+
+
+def main(argv=None):
+    """Dispatch to the module that implements the requested command"""
+    argv = sys.argv[1:] if argv is None else argv
+
+    if not argv or argv[0] in ('-h', '--help', 'help'):
+        print_usage()
+        return 0
+
+    command = argv[0]
+    if command not in COMMANDS:
+        print(f"Unknown command: {command}\n")
+        print_usage()
+        return 1
+
+    module, extra_args, _ = COMMANDS[command]
+    sys.argv = [f"{module}.py"] + extra_args + argv[1:]
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Per-call instrumentation for MultiAIAgent
+
+Every provider call produces one record (model, task type, token counts,
+time-to-first-token, latency, cache hits, retries, cost) that is appended
+to a JSONL log in logs/. Running this module summarizes the log with
+p50/p95 latency, token totals and cost per script and per task type.
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+CALL_LOG = os.getenv('AGENT_CALL_LOG', 'logs/agent_calls.jsonl')
+
+# USD per million tokens: (input, output, cache read)
+MODEL_PRICES = {
+    'claude-sonnet-4-20250514': (3.00, 15.00, 0.30),
+    'claude-3-5-haiku-20241022': (0.80, 4.00, 0.08),
+    'gemini-2.5-flash': (0.30, 2.50, 0.075),
+    'gemini-2.5-flash-lite': (0.10, 0.40, 0.025),
+}
+BATCH_DISCOUNT = 0.5    # Message Batches are billed at half price
+
+
+class CallLog:
+    """Instrumentation hook that appends call records to a JSONL file"""
+
+    def __init__(self, path=CALL_LOG):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+
+def new_record(provider, model, task_type):
+    """Start a call record with the fields every hook can rely on"""
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'script': os.path.basename(sys.argv[0]) or 'interactive',
+        'provider': provider,
+        'model': model,
+        'task_type': task_type,
+        'prompt_tokens': 0,
+        'response_tokens': 0,
+        'cache_read_tokens': 0,
+        'ttft_s': None,
+        'latency_s': None,
+        'stop_reason': None,
+        'cache_hit': False,
+        'retries': 0,
+        'continuations': 0,
+        'cost_usd': None,
+        'error': None,
+    }
+
+
+def call_cost(record):
+    """USD cost of a call from its token counts (None for unpriced models)"""
+    prices = MODEL_PRICES.get(record.get('model'))
+    if prices is None:
+        return None
+    input_price, output_price, cache_price = prices
+    prompt = record.get('prompt_tokens') or 0
+    cached = record.get('cache_read_tokens') or 0
+    if record.get('provider') == 'gemini':
+        prompt -= cached     # Gemini's prompt count includes cached tokens
+    cost = (prompt * input_price + cached * cache_price
+            + (record.get('response_tokens') or 0) * output_price) / 1e6
+    if record.get('provider') == 'anthropic-batch':
+        cost *= BATCH_DISCOUNT
+    return round(cost, 6)
+
+
+def read_records(path=CALL_LOG):
+    """Load all call records from a JSONL log"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def read_recent_records(path=CALL_LOG, max_bytes=256 * 1024):
+    """Load the records in the last max_bytes of a JSONL log"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - max_bytes))
+        lines = f.read().splitlines()
+    if size > max_bytes:
+        lines = lines[1:]     # first line is probably cut in half
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            pass
+    return records
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(records, key):
+    """Aggregate records grouped by `key` (e.g. 'script' or 'task_type')"""
+    groups = defaultdict(list)
+    for record in records:
+        groups[record.get(key) or '-'].append(record)
+
+    summary = {}
+    for name, group in groups.items():
+        latencies = [r['latency_s'] for r in group if r.get('latency_s') is not None]
+        ttfts = [r['ttft_s'] for r in group if r.get('ttft_s') is not None]
+        summary[name] = {
+            'calls': len(group),
+            'errors': sum(1 for r in group if r.get('error')),
+            'cache_hits': sum(1 for r in group if r.get('cache_hit')),
+            'retries': sum(r.get('retries', 0) for r in group),
+            'continuations': sum(r.get('continuations', 0) for r in group),
+            'p50_latency_s': percentile(latencies, 50),
+            'p95_latency_s': percentile(latencies, 95),
+            'p50_ttft_s': percentile(ttfts, 50),
+            'total_latency_s': sum(latencies),
+            'prompt_tokens': sum(r.get('prompt_tokens', 0) for r in group),
+            'response_tokens': sum(r.get('response_tokens', 0) for r in group),
+            'cost_usd': sum(_cost(r) for r in group),
+        }
+    return summary
+
+
+def _cost(record):
+    # Records logged before cost tracking are priced from their tokens
+    cost = record['cost_usd'] if 'cost_usd' in record else call_cost(record)
+    return cost or 0.0
+
+
+def _fmt_seconds(value):
+    return f"{value:7.2f}" if value is not None else "      -"
+
+
+def print_summary(records, key):
+    """Print a summary table grouped by `key`, slowest total first"""
+    summary = summarize(records, key)
+    print(f"\nBy {key}:")
+    print(f"  {'name':<30} {'calls':>5} {'err':>4} {'hit':>4} {'retry':>5} {'cont':>4} "
+          f"{'p50 s':>7} {'p95 s':>7} {'ttft s':>7} {'tok in':>8} {'tok out':>8} {'cost $':>8}")
+    ordered = sorted(summary.items(), key=lambda item: item[1]['total_latency_s'], reverse=True)
+    for name, s in ordered:
+        print(f"  {name:<30} {s['calls']:>5} {s['errors']:>4} {s['cache_hits']:>4} "
+              f"{s['retries']:>5} {s['continuations']:>4} "
+              f"{_fmt_seconds(s['p50_latency_s'])} {_fmt_seconds(s['p95_latency_s'])} "
+              f"{_fmt_seconds(s['p50_ttft_s'])} {s['prompt_tokens']:>8} {s['response_tokens']:>8} "
+              f"{s['cost_usd']:>8.4f}")
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else CALL_LOG
+    records = read_records(path)
+
+    print("\n" + "="*60)
+    print(f"AGENT CALL REPORT: {path}")
+    print("="*60)
+
+    if not records:
+        print("\nNo calls recorded yet.")
+        return
+
+    print(f"\nTotal calls: {len(records)}")
+    print(f"Total cost:  ${sum(_cost(r) for r in records):.4f}")
+    print_summary(records, 'script')
+    print_summary(records, 'task_type')
+    print_summary(records, 'model')
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
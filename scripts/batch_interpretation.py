@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Bulk biological interpretation for each genus (or each MAG) in the HQ manifest
+
+All queries go out as one Anthropic Message Batch instead of hundreds of
+interactive calls. The batch id and the custom_id -> manifest row mapping
+are saved in logs/batches/<batch_id>.json, so an interrupted run can be
+resumed with --resume <batch_id>.
+
+Usage:
+    python scripts/batch_interpretation.py                   # one query per genus
+    python scripts/batch_interpretation.py --by mag --limit 20
+    python scripts/batch_interpretation.py --resume msgbatch_...
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime
+
+from multi_ai_agent import CLAUDE_MODEL, MultiAIAgent
+
+HQ_MANIFEST = 'data/ruminococcaceae_HQ_manifest.tsv'
+BATCH_STATE_DIR = 'logs/batches'
+
+
+def genus_of(classification):
+    """Genus name from a GTDB classification string ('unclassified' if empty)"""
+    match = re.search(r'g__([^;]*)', classification or '')
+    return match.group(1) if match and match.group(1) else 'unclassified'
+
+
+def custom_id_for(name, used):
+    """Batch custom_id (1-64 chars of [A-Za-z0-9_-]) unique within `used`"""
+    base = re.sub(r'[^A-Za-z0-9_-]', '_', name)[:56] or 'item'
+    custom_id, n = base, 1
+    while custom_id in used:
+        n += 1
+        custom_id = f"{base}_{n}"
+    used.add(custom_id)
+    return custom_id
+
+
+def load_manifest(path=HQ_MANIFEST):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f, delimiter='\t'))
+
+
+def genus_queries(rows):
+    """One interpretation query per genus group; returns (queries, id_map)"""
+    groups = defaultdict(list)
+    for row in rows:
+        groups[genus_of(row['classification'])].append(row)
+
+    queries, id_map, used = {}, {}, set()
+    for genus, members in sorted(groups.items(), key=lambda item: -len(item[1])):
+        completeness = [float(r['Completeness']) for r in members if r.get('Completeness')]
+        contamination = [float(r['Contamination']) for r in members if r.get('Contamination')]
+        samples = sorted({r['sample_id'] for r in members})
+        custom_id = custom_id_for(f"genus_{genus}", used)
+        queries[custom_id] = f"""
+        Ruminococcaceae genus: {genus}
+        High-quality MAGs from herptile (reptile/amphibian) gut metagenomes: {len(members)}
+        Found in {len(samples)} samples
+        Mean completeness: {sum(completeness) / max(len(completeness), 1):.1f}%
+        Mean contamination: {sum(contamination) / max(len(contamination), 1):.2f}%
+
+        Provide a concise biological interpretation:
+        1. Known ecology and metabolism of this genus (fiber/CAZyme capacity, SCFA production)
+        2. Typical hosts; is presence in herptile guts expected or surprising?
+        3. What these MAGs could reveal in a comparison with mammalian references
+        """
+        id_map[custom_id] = {'genus': genus, 'bin_ids': [r['bin_id'] for r in members]}
+    return queries, id_map
+
+
+def mag_queries(rows):
+    """One interpretation query per MAG; returns (queries, id_map)"""
+    queries, id_map, used = {}, {}, set()
+    for row in rows:
+        genus = genus_of(row['classification'])
+        custom_id = custom_id_for(row['bin_id'], used)
+        queries[custom_id] = f"""
+        MAG {row['bin_id']} from herptile gut sample {row['sample_id']}
+        GTDB classification: {row['classification']}
+        CheckM completeness {row.get('Completeness')}%, contamination {row.get('Contamination')}%
+
+        Briefly interpret this MAG: likely ecological role of {genus} in a herptile gut,
+        and which genomic features are worth checking first.
+        """
+        id_map[custom_id] = {'genus': genus, 'bin_ids': [row['bin_id']],
+                             'sample_id': row['sample_id']}
+    return queries, id_map
+
+
+def state_path(batch_id):
+    return os.path.join(BATCH_STATE_DIR, f"{batch_id}.json")
+
+
+def save_state(state):
+    os.makedirs(BATCH_STATE_DIR, exist_ok=True)
+    with open(state_path(state['batch_id']), 'w') as f:
+        json.dump(state, f, indent=2)
+
+
+def load_state(batch_id):
+    with open(state_path(batch_id)) as f:
+        return json.load(f)
+
+
+def write_results(state, results, output, stop_reasons=None):
+    """
+    Map batch results back to genus/bin_id rows and write a TSV
+
+    Answers that stopped at max_tokens are written but marked 'yes' in the
+    truncated column.
+    """
+    stop_reasons = stop_reasons or {}
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    by_mag = state['by'] == 'mag'
+    with open(output, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter='\t')
+        if by_mag:
+            writer.writerow(['bin_id', 'sample_id', 'genus', 'truncated', 'interpretation'])
+        else:
+            writer.writerow(['genus', 'n_mags', 'bin_ids', 'truncated', 'interpretation'])
+        for custom_id, row in state['id_map'].items():
+            text = results.get(custom_id)
+            text = text.strip() if text else 'ERROR: no result'
+            truncated = 'yes' if stop_reasons.get(custom_id) == 'max_tokens' else 'no'
+            if by_mag:
+                writer.writerow([row['bin_ids'][0], row['sample_id'], row['genus'], truncated, text])
+            else:
+                writer.writerow([row['genus'], len(row['bin_ids']), ','.join(row['bin_ids']),
+                                 truncated, text])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch interpretation of HQ Ruminococcaceae MAGs")
+    parser.add_argument('--by', choices=['genus', 'mag'], default='genus')
+    parser.add_argument('--task-type', default='literature',
+                        choices=['bioinformatics', 'literature', 'analysis'])
+    parser.add_argument('--manifest', default=HQ_MANIFEST)
+    parser.add_argument('--limit', type=int, help="only the first N queries")
+    parser.add_argument('--resume', metavar='BATCH_ID', help="resume a submitted batch")
+    parser.add_argument('--submit-only', action='store_true', help="submit and exit")
+    parser.add_argument('--poll', type=float, default=30, help="seconds between status checks")
+    parser.add_argument('--output', help="results TSV (default results/<by>_interpretations.tsv)")
+    args = parser.parse_args()
+
+    agent = MultiAIAgent()
+
+    if args.resume:
+        state = load_state(args.resume)
+        print(f"\n🔁 Resuming batch {state['batch_id']} ({len(state['id_map'])} requests)")
+    else:
+        rows = load_manifest(args.manifest)
+        queries, id_map = mag_queries(rows) if args.by == 'mag' else genus_queries(rows)
+        if args.limit:
+            keep = list(queries)[:args.limit]
+            queries = {k: queries[k] for k in keep}
+            id_map = {k: id_map[k] for k in keep}
+
+        print("\n" + "="*60)
+        print(f"BATCH INTERPRETATION: {len(queries)} {args.by} queries")
+        print("="*60)
+
+        batch_id = agent.submit_batch(args.task_type, queries)
+        state = {
+            'batch_id': batch_id,
+            'by': args.by,
+            'task_type': args.task_type,
+            'manifest': args.manifest,
+            'submitted': datetime.now().isoformat(timespec='seconds'),
+            'id_map': id_map,
+            'queries': queries,
+        }
+        save_state(state)
+        print(f"💾 State saved to {state_path(batch_id)}")
+
+    if args.submit_only:
+        print(f"\n💡 Resume later with: python scripts/batch_interpretation.py --resume {state['batch_id']}")
+        return
+
+    agent.wait_for_batch(state['batch_id'], poll_interval=args.poll)
+    stop_reasons = {}
+    results = agent.batch_results(state['batch_id'], task_type=state['task_type'],
+                                  stop_reasons=stop_reasons)
+
+    output = args.output or f"results/{state['by']}_interpretations.tsv"
+    write_results(state, results, output, stop_reasons)
+    succeeded = sum(1 for text in results.values() if text)
+    print(f"\n✅ {succeeded}/{len(state['id_map'])} interpretations saved to {output}")
+    truncated = {custom_id for custom_id, reason in stop_reasons.items() if reason == 'max_tokens'}
+    if truncated:
+        print(f"⚠️  {len(truncated)} answers stopped at max_tokens (truncated column = yes)")
+
+    # Keep the answers searchable too; the TSV above is already safe.
+    # Truncated answers are left out so they are not reused as context.
+    try:
+        for custom_id, text in results.items():
+            if text and custom_id in state.get('queries', {}) and custom_id not in truncated:
+                agent.store.add_response(state['queries'][custom_id], text, task_type=state['task_type'],
+                                         provider='anthropic-batch', model=CLAUDE_MODEL)
+    except Exception as e:
+        print(f"⚠️  Could not store batch answers: {e}")
+
+
+if __name__ == "__main__":
+    main()
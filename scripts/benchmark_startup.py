@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold-start time of the agent entry points
+
+Each target is imported in a fresh interpreter several times and the
+median wall time is reported. The "eager imports" row measures the
+provider libraries that every script used to load at import time, which
+is the cost the lazy clients now defer until the first API call.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TARGETS = [
+    ("python (empty)", "pass"),
+    ("agent_cli (help)", "import agent_cli; agent_cli.print_usage"),
+    ("multi_ai_agent", "import multi_ai_agent"),
+    ("RuminococcaceaeAnalyzer()",
+     "import ruminococcaceae_analysis as r; r.RuminococcaceaeAnalyzer()"),
+    ("eager imports (old startup)",
+     "import dotenv, anthropic, google.generativeai"),
+]
+
+
+def time_import(code, repeats=5):
+    """Return sorted wall times (seconds) of running code in fresh interpreters"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=SCRIPTS_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            return None
+        times.append(elapsed)
+    return sorted(times)
+
+
+def run_startup_benchmark(repeats=5):
+    """Benchmark every target and return {label: median seconds or None}"""
+    results = {}
+    for label, code in TARGETS:
+        times = time_import(code, repeats)
+        results[label] = statistics.median(times) if times else None
+    return results
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print("\n" + "="*60)
+    print(f"COLD-START BENCHMARK (median of {repeats} runs)")
+    print("="*60)
+
+    results = run_startup_benchmark(repeats)
+    for label, median in results.items():
+        shown = f"{median*1000:8.1f} ms" if median is not None else "  not installed"
+        print(f"  {label:<30} {shown}")
+
+    lazy = results.get("RuminococcaceaeAnalyzer()")
+    eager = results.get("eager imports (old startup)")
+    if lazy is not None and eager is not None:
+        print(f"\n💡 Provider imports deferred: ~{eager*1000:.0f} ms saved per command "
+              f"that never calls a model ({eager / lazy:.1f}x the analyzer cold start)")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite that runs without API keys or the /bigdata tree
+
+Benchmarks run against synthetic data (synthetic_data.py) and local
+servers: a fake Anthropic/Gemini API (fake_llm_server.py) and an
+NCBI-style HTTP mirror. Results are appended to logs/benchmarks.jsonl
+and compared with the previous run at the same scale.
+
+Usage:
+    python scripts/benchmark_suite.py --scale 10
+    python scripts/benchmark_suite.py --scale 100 --only manifest,metadata
+"""
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import synthetic_data
+from agent_metrics import percentile
+
+BENCHMARK_LOG = 'logs/benchmarks.jsonl'
+REGRESSION_THRESHOLD = 0.20   # flag runs more than 20% slower than the last one
+REGIONS_PER_MAG = 5
+
+
+class SkipBenchmark(Exception):
+    """Raised when a benchmark cannot run here (e.g. missing package)"""
+
+
+def require(module):
+    """Import a module or skip the benchmark that needs it"""
+    try:
+        return __import__(module)
+    except ImportError:
+        raise SkipBenchmark(f"{module} not installed")
+
+
+@contextlib.contextmanager
+def patched_env(**values):
+    """Set environment variables for one benchmark and restore them afterwards"""
+    saved = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def isolated_agent(ctx, name):
+    """MultiAIAgent whose coalescing files and results store live in work_dir"""
+    from multi_ai_agent import MultiAIAgent
+    from request_coalescer import RequestCoalescer
+    from results_store import ResultsStore
+
+    agent = MultiAIAgent()
+    agent.hooks = []
+    agent.coalescer = RequestCoalescer(os.path.join(ctx['work_dir'], f"inflight_{name}"))
+    agent._store = ResultsStore(os.path.join(ctx['work_dir'], f"{name}_results.db"))
+    return agent
+
+
+def stub_env(server):
+    """Environment that points both providers at a fake LLM server"""
+    return {'ANTHROPIC_BASE_URL': server.url, 'GEMINI_BASE_URL': server.url,
+            'ANTHROPIC_API_KEY': 'stub', 'GOOGLE_API_KEY': 'stub'}
+
+
+# -- benchmarks -----------------------------------------------------------
+
+def bench_startup(ctx):
+    """Cold start of the CLI and analyzer (see benchmark_startup.py)"""
+    from benchmark_startup import run_startup_benchmark
+    results = run_startup_benchmark(repeats=3)
+    metrics = {label: round(value, 4) for label, value in results.items() if value is not None}
+    metrics['wall_s'] = metrics.get("RuminococcaceaeAnalyzer()")
+    return metrics
+
+
+def build_manifest(ctx):
+    """Build the HQ manifest from the synthetic tree; returns (HQ rows, seconds)"""
+    require('pandas')
+    from create_rumino_manifest import create_ruminococcaceae_manifest
+    out_dir = os.path.join(ctx['work_dir'], 'manifest')
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        high_quality = create_ruminococcaceae_manifest(project_base=ctx['data_dir'], out_dir=out_dir)
+    ctx['hq_manifest'] = os.path.join(out_dir, 'ruminococcaceae_HQ_manifest.tsv')
+    return high_quality, time.perf_counter() - start
+
+
+def bench_manifest(ctx):
+    """create_ruminococcaceae_manifest over the synthetic GTDB/CheckM tree"""
+    high_quality, wall = build_manifest(ctx)
+    return {'wall_s': round(wall, 4), 'hq_bins': len(high_quality)}
+
+
+def bench_metadata(ctx):
+    """filter_reference_genomes (smart-filter) over header-less GTDB metadata"""
+    require('pandas')
+    from smart_auto_download import filter_reference_genomes
+    metadata = f"{ctx['data_dir']}/reference_genomes/ruminococcaceae_metadata.tsv"
+    out_dir = os.path.join(ctx['work_dir'], 'filtered_genomes')
+
+    start = time.perf_counter()
+    rows, selected = filter_reference_genomes(metadata, out_dir)
+    return {'wall_s': round(time.perf_counter() - start, 4), 'rows': rows, 'selected': selected}
+
+
+def download_genome(accession, base_url, out_dir, max_retries=3):
+    """Python port of download_genome() in jobs/03_download_final.sh"""
+    clean_acc = re.sub(r'^[A-Z]*_', '', accession)
+    acc_prefix, acc_rest = clean_acc.split('_')
+    acc_number = acc_rest.split('.')[0]
+    acc_dir = f"{acc_number[0:3]}/{acc_number[3:6]}/{acc_number[6:9]}"
+    listing_url = f"{base_url}/genomes/all/{acc_prefix}/{acc_dir}/"
+
+    for attempt in range(max_retries):
+        try:
+            listing = urllib.request.urlopen(listing_url, timeout=30).read().decode()
+            match = re.search(re.escape(clean_acc) + r'_[^/"]*', listing)
+            if not match:
+                return False
+            actual_dir = match.group(0)
+            fna_url = f"{listing_url}{actual_dir}/{actual_dir}_genomic.fna.gz"
+            with urllib.request.urlopen(fna_url, timeout=30) as response, \
+                    open(f"{out_dir}/{clean_acc}_genomic.fna.gz", 'wb') as f:
+                shutil.copyfileobj(response, f)
+            return True
+        except OSError:
+            time.sleep(0.1 * (attempt + 1))
+    return False
+
+
+def bench_downloads(ctx):
+    """Parallel genome downloads (8 jobs) from a local NCBI-style mirror"""
+    mirror = f"{ctx['data_dir']}/ncbi_mirror"
+    with open(f"{ctx['data_dir']}/filtered_genomes/accession_list.txt") as f:
+        accessions = [line.strip() for line in f if line.strip()]
+    out_dir = os.path.join(ctx['work_dir'], 'genomes')
+    os.makedirs(out_dir, exist_ok=True)
+
+    handler = functools.partial(QuietHTTPRequestHandler, directory=mirror)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ok = list(pool.map(lambda acc: download_genome(acc, base_url, out_dir), accessions))
+        wall = time.perf_counter() - start
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    size = sum(os.path.getsize(os.path.join(out_dir, name)) for name in os.listdir(out_dir))
+    return {'wall_s': round(wall, 4), 'genomes': len(accessions),
+            'failed': ok.count(False), 'mb_per_s': round(size / 1e6 / wall, 2)}
+
+
+class QuietHTTPRequestHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def read_contig(path, contig):
+    """Naive lookup: parse the whole FASTA file for one contig"""
+    with open(path) as f:
+        for record in f.read().split('>')[1:]:
+            header, _, seq = record.partition('\n')
+            if header.split()[0] == contig:
+                return seq.replace('\n', '')
+    return None
+
+
+def ensure_region_mags(mag_dir, n):
+    """Full-size MAGs for region_fetch, generated once and reused"""
+    marker = os.path.join(mag_dir, f".complete_{n}")
+    if not os.path.exists(marker):
+        shutil.rmtree(mag_dir, ignore_errors=True)
+        print(f"  🧬 Generating {n} MAGs of ~3 Mb in {mag_dir} (one-off)...")
+        synthetic_data.generate_mags(mag_dir, n, random.Random(42))
+        with open(marker, 'w') as f:
+            f.write(datetime.now().isoformat())
+    return {name[:-3]: os.path.join(mag_dir, name)
+            for name in sorted(os.listdir(mag_dir)) if name.endswith('.fa')}
+
+
+def bench_region_fetch(ctx):
+    """500 bp regions from ~3 Mb MAGs: indexed mmap fetch vs re-reading each file"""
+    from fasta_index import GenomeCollection
+
+    if not ctx['fasta']:
+        raise SkipBenchmark("MAG FASTA generation disabled (--no-fasta)")
+    paths = ensure_region_mags(os.path.join(ctx['data_dir'], 'region_mags'), ctx['region_mags'])
+    size = sum(os.path.getsize(path) for path in paths.values())
+
+    collection = GenomeCollection(paths, cache_dir=os.path.join(ctx['work_dir'], 'fasta_index'))
+    start = time.perf_counter()
+    collection.build_all()
+    index_wall = time.perf_counter() - start
+
+    # Opening reads the cached .fai and maps the file; timed apart from fetching
+    start = time.perf_counter()
+    genomes = {genome_id: collection.genome(genome_id) for genome_id in paths}
+    open_wall = time.perf_counter() - start
+
+    rng = random.Random(0)
+    regions = []
+    for genome_id, fasta in genomes.items():
+        for _ in range(REGIONS_PER_MAG):
+            contig = rng.choice(fasta.contigs)
+            offset = rng.randrange(0, fasta.length(contig) - 500)
+            regions.append((genome_id, contig, offset))
+
+    start = time.perf_counter()
+    fetched = [collection.fetch(genome_id, contig, offset, offset + 500)
+               for genome_id, contig, offset in regions]
+    fetch_wall = time.perf_counter() - start
+    collection.close()
+
+    # Baseline: parse the whole file to get the same region
+    start = time.perf_counter()
+    expected = [read_contig(paths[genome_id], contig)[offset:offset + 500]
+                for genome_id, contig, offset in regions]
+    full_read_wall = time.perf_counter() - start
+
+    mismatches = sum(1 for got, want in zip(fetched, expected) if got.decode() != want)
+    return {'wall_s': round(fetch_wall, 4), 'genomes': len(paths), 'regions': len(regions),
+            'mb': round(size / 1e6, 1), 'open_s': round(open_wall, 4),
+            'index_build_s': round(index_wall, 4), 'full_read_s': round(full_read_wall, 4),
+            'mismatches': mismatches}
+
+
+def bench_agent_fanout(ctx):
+    """Concurrent analyze_ruminococcaceae calls against the fake LLM server"""
+    require('anthropic')
+    require('google.generativeai')
+    from fake_llm_server import FakeLLMConfig, FakeLLMServer
+
+    n_queries = ctx['fanout_queries']
+    config = FakeLLMConfig(latency=ctx['llm_latency'], response_tokens=300)
+    with FakeLLMServer(config) as server, patched_env(**stub_env(server)):
+        records = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = isolated_agent(ctx, 'fanout')
+            agent.hooks = [records.append]
+            task_types = ['bioinformatics', 'literature', 'analysis']
+            queries = [(task_types[i % 3], f"Benchmark query {i} for genus group {i % 36}")
+                       for i in range(n_queries)]
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=ctx['fanout_workers']) as pool:
+                list(pool.map(lambda q: agent.analyze_ruminococcaceae(*q), queries))
+            wall = time.perf_counter() - start
+
+    latencies = [r['latency_s'] for r in records if r.get('latency_s') is not None]
+    ttfts = [r['ttft_s'] for r in records if r.get('ttft_s') is not None]
+    return {
+        'wall_s': round(wall, 4),
+        'queries': n_queries,
+        'upstream_calls': sum(v for k, v in server.calls.items() if k != 'throttled'),
+        'queries_per_s': round(n_queries / wall, 2),
+        'p50_latency_s': percentile(latencies, 50),
+        'p95_latency_s': percentile(latencies, 95),
+        'p50_ttft_s': percentile(ttfts, 50),
+    }
+
+
+def bench_hedging(ctx):
+    """Tail latency of a multi-call plan with stragglers, with and without hedging"""
+    require('anthropic')
+    require('google.generativeai')
+    import model_router
+    from fake_llm_server import FakeLLMConfig, FakeLLMServer
+
+    n_queries = 40
+    # One straggler in 12 requests: above the p90 the deadline is based on,
+    # enough to show up in the p95
+    config = FakeLLMConfig(latency=ctx['llm_latency'], slow_every=12, slow_latency=3.0)
+    results = {}
+    with FakeLLMServer(config) as server, patched_env(**stub_env(server)):
+        for mode in ('no_hedge', 'hedged'):
+            with contextlib.redirect_stdout(io.StringIO()):
+                agent = isolated_agent(ctx, f"hedging_{mode}")
+                agent.coalescer = None
+                agent.router = model_router.ModelRouter(hedge=(mode == 'hedged'))
+
+                def timed(i):
+                    start = time.perf_counter()
+                    agent.analyze_ruminococcaceae('bioinformatics', f"{mode} plan step {i} " + "x" * 400)
+                    return time.perf_counter() - start
+
+                with ThreadPoolExecutor(max_workers=4) as pool:
+                    list(pool.map(timed, range(10)))       # warm the latency window
+                    start = time.perf_counter()
+                    latencies = list(pool.map(timed, range(10, 10 + n_queries)))
+                    wall = time.perf_counter() - start
+            results[mode] = (wall, percentile(latencies, 50), percentile(latencies, 95))
+
+    return {
+        'wall_s': round(results['hedged'][0], 4),
+        'no_hedge_wall_s': round(results['no_hedge'][0], 4),
+        'hedged_p50_s': round(results['hedged'][1], 4),
+        'hedged_p95_s': round(results['hedged'][2], 4),
+        'no_hedge_p50_s': round(results['no_hedge'][1], 4),
+        'no_hedge_p95_s': round(results['no_hedge'][2], 4),
+    }
+
+
+def bench_coalescing(ctx):
+    """Identical concurrent requests from threads and processes share one upstream call"""
+    require('anthropic')
+    from fake_llm_server import FakeLLMConfig, FakeLLMServer
+
+    n_threads, n_processes = 16, 4
+    coalesce_dir = os.path.join(ctx['work_dir'], 'inflight')
+    with FakeLLMServer(FakeLLMConfig(latency=0.5)) as server:
+        overrides = dict(stub_env(server), AGENT_COALESCE_DIR=coalesce_dir,
+                         AGENT_CALL_LOG=os.path.join(ctx['work_dir'], 'coalesce_calls.jsonl'),
+                         RESULTS_DB=os.path.join(ctx['work_dir'], 'coalescing_results.db'))
+        env = dict(os.environ, **overrides)
+        with patched_env(**overrides):
+            with contextlib.redirect_stdout(io.StringIO()):
+                agent = isolated_agent(ctx, 'coalescing')
+                agent.coalescer.cache_dir = coalesce_dir
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=n_threads) as pool:
+                    answers = set(pool.map(
+                        lambda _: agent.analyze_ruminococcaceae('bioinformatics', "Shared Lachnospiraceae comparison"),
+                        range(n_threads)))
+                thread_wall = time.perf_counter() - start
+            thread_calls = server.calls['anthropic.messages']
+            server.reset_counts()
+
+            code = ("from multi_ai_agent import MultiAIAgent; "
+                    "MultiAIAgent().analyze_ruminococcaceae('literature', 'Shared literature review')")
+            scripts_dir = os.path.dirname(os.path.abspath(__file__))
+            start = time.perf_counter()
+            procs = [subprocess.Popen([sys.executable, '-c', code], cwd=scripts_dir, env=env,
+                                      stdout=subprocess.DEVNULL)
+                     for _ in range(n_processes)]
+            failed = sum(1 for proc in procs if proc.wait() != 0)
+            process_wall = time.perf_counter() - start
+            process_calls = server.calls['gemini.generateContent']
+
+    return {
+        'wall_s': round(thread_wall, 4),
+        'thread_callers': n_threads,
+        'thread_upstream_calls': thread_calls,
+        'distinct_answers': len(answers),
+        'process_callers': n_processes,
+        'process_upstream_calls': process_calls,
+        'process_failures': failed,
+        'process_wall_s': round(process_wall, 4),
+    }
+
+
+def bench_batch(ctx):
+    """Per-MAG interpretation of the synthetic HQ manifest as one Message Batch against the stub"""
+    require('anthropic')
+    from batch_interpretation import load_manifest, mag_queries
+    from fake_llm_server import FakeLLMConfig, FakeLLMServer
+
+    if 'hq_manifest' not in ctx:
+        build_manifest(ctx)
+    queries, _ = mag_queries(load_manifest(ctx['hq_manifest']))
+    with FakeLLMServer(FakeLLMConfig(batch_delay=1.0)) as server, patched_env(**stub_env(server)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = isolated_agent(ctx, 'batch')
+            start = time.perf_counter()
+            batch_id = agent.submit_batch('literature', queries)
+            agent.wait_for_batch(batch_id, poll_interval=0.25)
+            results = agent.batch_results(batch_id)
+            wall = time.perf_counter() - start
+
+    return {
+        'wall_s': round(wall, 4),
+        'requests': len(queries),
+        'succeeded': sum(1 for text in results.values() if text),
+        'upstream_calls': sum(server.calls.values()),
+    }
+
+
+BENCHMARKS = {
+    'startup': bench_startup,
+    'manifest': bench_manifest,
+    'metadata': bench_metadata,
+    'downloads': bench_downloads,
+    'region_fetch': bench_region_fetch,
+    'agent_fanout': bench_agent_fanout,
+    'hedging': bench_hedging,
+    'coalescing': bench_coalescing,
+    'batch': bench_batch,
+}
+
+
+# -- results --------------------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_results(path, scale):
+    """Most recent metrics per benchmark at this scale"""
+    previous = {}
+    if not os.path.exists(path):
+        return previous
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get('scale') == scale:
+                    previous[entry['benchmark']] = entry
+    return previous
+
+
+def save_result(path, entry):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+
+
+def ensure_data(data_dir, scale, fasta):
+    """Generate synthetic data once per scale and reuse it afterwards"""
+    marker = os.path.join(data_dir, '.complete')
+    if os.path.exists(marker):
+        return
+    print(f"🧬 Generating synthetic data at {scale}x scale in {data_dir} (one-off)...")
+    start = time.perf_counter()
+    synthetic_data.generate_project(data_dir, scale, fasta=fasta)
+    with open(marker, 'w') as f:
+        f.write(datetime.now().isoformat())
+    print(f"   done in {time.perf_counter() - start:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Ruminococcaceae agent benchmark suite")
+    parser.add_argument('--scale', type=float, default=10, help="multiple of the current 2,480 bins")
+    parser.add_argument('--only', help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--data-dir', help="where synthetic data is generated/cached")
+    parser.add_argument('--no-fasta', action='store_true', help="skip MAG FASTA generation")
+    parser.add_argument('--region-mags', type=int, default=30, help="~3 Mb MAGs for region_fetch")
+    parser.add_argument('--fanout-queries', type=int, default=48)
+    parser.add_argument('--fanout-workers', type=int, default=8)
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="fake server latency (s)")
+    parser.add_argument('--log', default=BENCHMARK_LOG)
+    parser.add_argument('--no-save', action='store_true', help="do not record results")
+    args = parser.parse_args()
+
+    selected = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    data_dir = args.data_dir or os.path.join(tempfile.gettempdir(), 'rumino_bench', f"scale_{args.scale:g}")
+    if any(name in selected for name in ('manifest', 'metadata', 'downloads', 'batch')):
+        ensure_data(data_dir, args.scale, fasta=not args.no_fasta)
+
+    previous = previous_results(args.log, args.scale)
+    commit = git_commit()
+
+    print("\n" + "="*70)
+    print(f"BENCHMARK SUITE (scale {args.scale:g}x, commit {commit or '?'})")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory(prefix='rumino_bench_') as work_dir:
+        ctx = {
+            'data_dir': data_dir,
+            'work_dir': work_dir,
+            'scale': args.scale,
+            'fasta': not args.no_fasta,
+            'region_mags': args.region_mags,
+            'fanout_queries': args.fanout_queries,
+            'fanout_workers': args.fanout_workers,
+            'llm_latency': args.llm_latency,
+        }
+        for name in selected:
+            print(f"\n[{name}] {BENCHMARKS[name].__doc__.strip()}")
+            try:
+                metrics = BENCHMARKS[name](ctx)
+            except SkipBenchmark as e:
+                print(f"  ⏭️  skipped: {e}")
+                continue
+
+            for key, value in metrics.items():
+                print(f"  {key:<30} {value}")
+
+            last = previous.get(name)
+            if last and last['metrics'].get('wall_s') and metrics.get('wall_s'):
+                change = metrics['wall_s'] / last['metrics']['wall_s'] - 1
+                flag = "⚠️  REGRESSION" if change > REGRESSION_THRESHOLD else "✓"
+                print(f"  {flag} wall_s {change:+.1%} vs {last.get('commit') or '?'} "
+                      f"({last['metrics']['wall_s']} s)")
+
+            if not args.no_save:
+                save_result(args.log, {
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                    'commit': commit,
+                    'scale': args.scale,
+                    'benchmark': name,
+                    'metrics': metrics,
+                })
+
+    print("\n" + "="*70)
+    if not args.no_save:
+        print(f"📄 Results appended to {args.log}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
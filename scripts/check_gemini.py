@@ -1,8 +1,8 @@
 import os
-from dotenv import load_dotenv
 import google.generativeai as genai
+from multi_ai_agent import load_api_keys
 
-load_dotenv('configs/api_keys.env')
+load_api_keys()
 genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
 
 print("Available Gemini models:")
@@ -8,12 +8,14 @@ import pandas as pd
 import glob
 import os
 
-def create_ruminococcaceae_manifest():
+PROJECT_BASE = "/bigdata/stajichlab/shared/projects/Herptile/Metagenome/Fecal"
+
+def create_ruminococcaceae_manifest(project_base=PROJECT_BASE, out_dir='data'):
     """Create manifest file with bin IDs and file paths"""
     
-    gtdb_base = "/bigdata/stajichlab/shared/projects/Herptile/Metagenome/Fecal/results_bins_gtkdb"
-    checkm_base = "/bigdata/stajichlab/shared/projects/Herptile/Metagenome/Fecal/results_bins_checkm"
-    bins_base = "/bigdata/stajichlab/shared/projects/Herptile/Metagenome/Fecal/results"
+    gtdb_base = f"{project_base}/results_bins_gtkdb"
+    checkm_base = f"{project_base}/results_bins_checkm"
+    bins_base = f"{project_base}/results"
     
     manifest = []
     
@@ -85,16 +87,16 @@ def create_ruminococcaceae_manifest():
     high_quality = high_quality.sort_values('quality_score', ascending=False)
     
     # Save manifest files
-    os.makedirs('data', exist_ok=True)
+    os.makedirs(out_dir, exist_ok=True)
     
     # All Ruminococcaceae (no quality filter)
-    manifest_df.to_csv('data/ruminococcaceae_all_manifest.tsv', sep='\t', index=False)
+    manifest_df.to_csv(f'{out_dir}/ruminococcaceae_all_manifest.tsv', sep='\t', index=False)
     
     # High quality only
-    high_quality.to_csv('data/ruminococcaceae_HQ_manifest.tsv', sep='\t', index=False)
+    high_quality.to_csv(f'{out_dir}/ruminococcaceae_HQ_manifest.tsv', sep='\t', index=False)
     
     # Simple list for downstream tools
-    with open('data/ruminococcaceae_HQ_bins.txt', 'w') as f:
+    with open(f'{out_dir}/ruminococcaceae_HQ_bins.txt', 'w') as f:
         for path in high_quality['mag_path']:
             f.write(path + '\n')
     
@@ -104,9 +106,9 @@ def create_ruminococcaceae_manifest():
     print(f"Total Ruminococcaceae MAGs: {len(manifest_df)}")
     print(f"High-quality MAGs (>90% complete, <5% contam): {len(high_quality)}")
     print(f"\nFiles saved:")
-    print(f"  - data/ruminococcaceae_all_manifest.tsv (all MAGs)")
-    print(f"  - data/ruminococcaceae_HQ_manifest.tsv (high quality)")
-    print(f"  - data/ruminococcaceae_HQ_bins.txt (file paths only)")
+    print(f"  - {out_dir}/ruminococcaceae_all_manifest.tsv (all MAGs)")
+    print(f"  - {out_dir}/ruminococcaceae_HQ_manifest.tsv (high quality)")
+    print(f"  - {out_dir}/ruminococcaceae_HQ_bins.txt (file paths only)")
     print(f"\n💾 Total size: ~{(len(manifest_df) + len(high_quality)) * 0.001:.2f} KB")
     print(f"{'='*60}\n")
     
@@ -4,7 +4,7 @@ Evaluate the scientific merit of the Ruminococcaceae MAG project
 """
 
 from ruminococcaceae_analysis import RuminococcaceaeAnalyzer
-import os
+from results_store import save_report
 
 analyzer = RuminococcaceaeAnalyzer()
 
@@ -35,14 +35,9 @@ Critical evaluation needed:
 
 print(lit_response)
 
-# Save results
-os.makedirs('results', exist_ok=True)
-with open('results/project_evaluation.txt', 'w') as f:
-    f.write("="*70 + "\n")
-    f.write("SCIENTIFIC EVALUATION\n")
-    f.write("="*70 + "\n\n")
-    f.write(lit_response)
-    f.write("\n\n")
+# Save results (results/ text file plus a copy in the results store)
+report = "="*70 + "\n" + "SCIENTIFIC EVALUATION\n" + "="*70 + "\n\n" + lit_response + "\n\n"
+save_report('project_evaluation.txt', report)
 
 print("\n" + "="*70)
 print("✓ Evaluation complete!")
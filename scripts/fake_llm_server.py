@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Local stub of the Anthropic and Gemini HTTP APIs for benchmarks
+
+Point the agent at it with:
+    ANTHROPIC_BASE_URL=http://127.0.0.1:<port>
+    GEMINI_BASE_URL=http://127.0.0.1:<port>
+
+Supported endpoints:
+    POST /v1/messages                               (JSON or SSE stream)
+    POST /v1/messages/batches                       (Message Batches)
+    GET  /v1/messages/batches/<id>[/results]
+    POST /v1beta/models/<model>:generateContent
+    POST /v1beta/models/<model>:streamGenerateContent
+
+Latency (including periodic stragglers), streaming speed, response
+length and throttling (HTTP 429) are configurable, and every request is
+counted per endpoint so benchmarks can assert how many upstream calls
+were made.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMConfig:
+    """Tunable behaviour of the stub server"""
+
+    def __init__(self, latency=0.2, chunk_delay=0.01, response_tokens=200,
+                 chunks=10, throttle_every=0, max_concurrent=0, batch_delay=1.0,
+                 slow_every=0, slow_latency=0.0):
+        self.latency = latency                  # seconds before the first byte
+        self.chunk_delay = chunk_delay          # seconds between stream chunks
+        self.response_tokens = response_tokens  # words in each response
+        self.chunks = chunks                    # stream chunks per response
+        self.throttle_every = throttle_every    # 429 on every Nth request (0 = never)
+        self.max_concurrent = max_concurrent    # 429 above N in-flight requests (0 = no limit)
+        self.batch_delay = batch_delay          # seconds until a batch has ended
+        self.slow_every = slow_every            # every Nth request is a straggler (0 = never)
+        self.slow_latency = slow_latency        # extra seconds added to stragglers
+
+
+def fake_text(prompt, n_tokens):
+    """Deterministic pseudo-answer of n_tokens words for a prompt"""
+    digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+    words = [f"w{digest}{i % 97}" for i in range(n_tokens)]
+    return f"[stub {digest}] " + " ".join(words)
+
+
+def split_chunks(text, n):
+    """Split text into n roughly equal pieces"""
+    size = max(1, len(text) // n)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Request handler; server state lives on self.server"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- helpers ----------------------------------------------------------
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        return json.loads(body or b'{}')
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_chunk(self, data):
+        data = data.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _throttled(self, endpoint):
+        """Count the request and decide whether to answer 429"""
+        server = self.server
+        with server.lock:
+            server.calls[endpoint] += 1
+            server.total_requests += 1
+            n = server.total_requests
+            over_limit = (server.config.max_concurrent
+                          and server.in_flight >= server.config.max_concurrent)
+            every = server.config.throttle_every
+            if over_limit or (every and n % every == 0):
+                server.calls['throttled'] += 1
+                return True
+            server.in_flight += 1
+            self.extra_latency = 0.0
+            if server.config.slow_every and n % server.config.slow_every == 0:
+                self.extra_latency = server.config.slow_latency
+            return False
+
+    def _done(self):
+        with self.server.lock:
+            self.server.in_flight -= 1
+
+    # -- routing ----------------------------------------------------------
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        if path == '/v1/messages/batches':
+            self._create_batch()
+            return
+        if path == '/v1/messages':
+            self._anthropic_messages()
+            return
+        match = re.match(r'^/v1beta/models/([^:/]+):(generateContent|streamGenerateContent)$', path)
+        if match:
+            self._gemini_generate(match.group(1), stream=match.group(2) == 'streamGenerateContent')
+            return
+        self._send_json(404, {"error": {"message": f"unknown endpoint {path}"}})
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        match = re.match(r'^/v1/messages/batches/([^/]+)(/results)?$', path)
+        if match:
+            self._batch(match.group(1), results=bool(match.group(2)))
+            return
+        self._send_json(404, {"error": {"message": f"unknown endpoint {path}"}})
+
+    # -- Anthropic --------------------------------------------------------
+
+    def _anthropic_messages(self):
+        request = self._read_json()
+        if self._throttled('anthropic.messages'):
+            self._send_json(429, {"type": "error", "error": {
+                "type": "rate_limit_error", "message": "stub throttled"}})
+            return
+        try:
+            config = self.server.config
+            time.sleep(config.latency + self.extra_latency)
+
+            messages = request.get('messages', [])
+            prompt = json.dumps(messages)
+            # An assistant prefill continues the answer, so only the
+            # remaining words are produced
+            done = 0
+            if messages and messages[-1].get('role') == 'assistant':
+                done = len(str(messages[-1].get('content', '')).split())
+            remaining = max(0, config.response_tokens - done)
+            max_tokens = request.get('max_tokens', config.response_tokens)
+            n_tokens = min(remaining, max_tokens)
+            text = fake_text(prompt, n_tokens)
+            stop_reason = 'max_tokens' if remaining > max_tokens else 'end_turn'
+            usage = {"input_tokens": len(prompt.split()), "output_tokens": n_tokens}
+            message = {
+                "id": f"msg_stub_{self.server.total_requests}",
+                "type": "message",
+                "role": "assistant",
+                "model": request.get('model'),
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": stop_reason,
+                "stop_sequence": None,
+                "usage": usage,
+            }
+
+            if not request.get('stream'):
+                self._send_json(200, message)
+                return
+
+            def event(name, data):
+                self._write_chunk(f"event: {name}\ndata: {json.dumps(data)}\n\n")
+
+            self._start_stream('text/event-stream')
+            event('message_start', {"type": "message_start", "message": dict(
+                message, content=[], stop_reason=None,
+                usage={"input_tokens": usage['input_tokens'], "output_tokens": 1})})
+            event('content_block_start', {"type": "content_block_start", "index": 0,
+                                          "content_block": {"type": "text", "text": ""}})
+            for piece in split_chunks(text, config.chunks):
+                event('content_block_delta', {"type": "content_block_delta", "index": 0,
+                                              "delta": {"type": "text_delta", "text": piece}})
+                time.sleep(config.chunk_delay)
+            event('content_block_stop', {"type": "content_block_stop", "index": 0})
+            event('message_delta', {"type": "message_delta",
+                                    "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                                    "usage": {"output_tokens": n_tokens}})
+            event('message_stop', {"type": "message_stop"})
+            self._end_stream()
+        finally:
+            self._done()
+
+    # -- Anthropic Message Batches -----------------------------------------
+
+    def _create_batch(self):
+        request = self._read_json()
+        server = self.server
+        with server.lock:
+            server.calls['anthropic.batches.create'] += 1
+            batch_id = f"msgbatch_stub_{len(server.batches) + 1}"
+            server.batches[batch_id] = {'created': time.time(), 'requests': request.get('requests', [])}
+        self._send_json(200, self._batch_object(batch_id))
+
+    def _batch_object(self, batch_id):
+        batch = self.server.batches[batch_id]
+        n = len(batch['requests'])
+        ended = time.time() - batch['created'] >= self.server.config.batch_delay
+        created = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(batch['created']))
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0 if ended else n, "succeeded": n if ended else 0,
+                               "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": created,
+            "expires_at": created,
+            "ended_at": created if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": (f"http://{self.headers.get('Host')}/v1/messages/batches/{batch_id}/results"
+                            if ended else None),
+        }
+
+    def _batch(self, batch_id, results):
+        server = self.server
+        with server.lock:
+            server.calls['anthropic.batches.results' if results else 'anthropic.batches.retrieve'] += 1
+        if batch_id not in server.batches:
+            self._send_json(404, {"type": "error", "error": {
+                "type": "not_found_error", "message": f"no batch {batch_id}"}})
+            return
+        if not results:
+            self._send_json(200, self._batch_object(batch_id))
+            return
+
+        lines = []
+        for item in server.batches[batch_id]['requests']:
+            params = item.get('params', {})
+            prompt = json.dumps(params.get('messages', []))
+            max_tokens = params.get('max_tokens', 1024)
+            n_tokens = min(server.config.response_tokens, max_tokens)
+            stop_reason = 'max_tokens' if server.config.response_tokens > max_tokens else 'end_turn'
+            lines.append(json.dumps({"custom_id": item.get('custom_id'), "result": {
+                "type": "succeeded",
+                "message": {
+                    "id": f"msg_{item.get('custom_id')}", "type": "message", "role": "assistant",
+                    "model": params.get('model'),
+                    "content": [{"type": "text", "text": fake_text(prompt, n_tokens)}],
+                    "stop_reason": stop_reason, "stop_sequence": None,
+                    "usage": {"input_tokens": len(prompt.split()), "output_tokens": n_tokens},
+                },
+            }}))
+        body = ('\n'.join(lines) + '\n').encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/binary')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # -- Gemini -----------------------------------------------------------
+
+    def _gemini_generate(self, model, stream):
+        request = self._read_json()
+        if self._throttled('gemini.generateContent'):
+            self._send_json(429, {"error": {"code": 429, "message": "stub throttled",
+                                            "status": "RESOURCE_EXHAUSTED"}})
+            return
+        try:
+            config = self.server.config
+            time.sleep(config.latency + self.extra_latency)
+
+            prompt = json.dumps(request.get('contents', []))
+            text = fake_text(prompt, config.response_tokens)
+            usage = {"promptTokenCount": len(prompt.split()),
+                     "candidatesTokenCount": config.response_tokens,
+                     "totalTokenCount": len(prompt.split()) + config.response_tokens}
+
+            def response(piece, finish):
+                candidate = {"content": {"parts": [{"text": piece}], "role": "model"}, "index": 0}
+                if finish:
+                    candidate["finishReason"] = "STOP"
+                return {"candidates": [candidate], "usageMetadata": usage, "modelVersion": model}
+
+            if not stream:
+                self._send_json(200, response(text, True))
+                return
+
+            # alt=sse streams server-sent events; the Python REST transport
+            # asks for a streamed JSON array instead
+            sse = 'alt=sse' in self.path
+            pieces = split_chunks(text, config.chunks)
+            self._start_stream('text/event-stream' if sse else 'application/json')
+            if not sse:
+                self._write_chunk('[')
+            for i, piece in enumerate(pieces):
+                payload = json.dumps(response(piece, i == len(pieces) - 1))
+                if sse:
+                    self._write_chunk(f"data: {payload}\n\n")
+                else:
+                    self._write_chunk(("," if i else "") + payload)
+                time.sleep(config.chunk_delay)
+            if not sse:
+                self._write_chunk(']')
+            self._end_stream()
+        finally:
+            self._done()
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    """Ignores clients that hang up mid-response (e.g. cancelled hedges)"""
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeLLMServer:
+    """Threaded stub server that can run in the background of a benchmark"""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.httpd = QuietHTTPServer((host, port), FakeLLMHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = config or FakeLLMConfig()
+        self.httpd.lock = threading.Lock()
+        self.httpd.calls = Counter()
+        self.httpd.total_requests = 0
+        self.httpd.in_flight = 0
+        self.httpd.batches = {}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def config(self):
+        return self.httpd.config
+
+    @property
+    def calls(self):
+        """Counter of requests per endpoint (plus 'throttled')"""
+        return self.httpd.calls
+
+    def reset_counts(self):
+        with self.httpd.lock:
+            self.httpd.calls.clear()
+            self.httpd.total_requests = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake Anthropic/Gemini server")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help="seconds before first byte")
+    parser.add_argument('--chunk-delay', type=float, default=0.01, help="seconds between stream chunks")
+    parser.add_argument('--tokens', type=int, default=200, help="words per response")
+    parser.add_argument('--throttle-every', type=int, default=0, help="429 on every Nth request")
+    parser.add_argument('--max-concurrent', type=int, default=0, help="429 above N in-flight requests")
+    parser.add_argument('--batch-delay', type=float, default=1.0, help="seconds until a batch ends")
+    parser.add_argument('--slow-every', type=int, default=0, help="every Nth request is a straggler")
+    parser.add_argument('--slow-latency', type=float, default=0.0, help="extra seconds for stragglers")
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(latency=args.latency, chunk_delay=args.chunk_delay,
+                           response_tokens=args.tokens, throttle_every=args.throttle_every,
+                           max_concurrent=args.max_concurrent, batch_delay=args.batch_delay,
+                           slow_every=args.slow_every, slow_latency=args.slow_latency)
+    server = FakeLLMServer(config, port=args.port)
+    print(f"🧪 Fake LLM server listening on {server.url}")
+    print(f"   export ANTHROPIC_BASE_URL={server.url}")
+    print(f"   export GEMINI_BASE_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
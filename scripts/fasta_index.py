@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+faidx-style random access to contigs across the MAG collection
+
+Each genome gets a samtools-compatible .fai index (name, length, offset,
+line bases, line width) built once and cached under data/fasta_index/.
+Gzipped references (.fna.gz) are decompressed once into the same cache;
+BGZF files are treated the same way since they are valid gzip. Sequence
+is served from an mmap of the plain FASTA, so fetching a region reads
+only the pages that hold the requested bytes.
+
+Usage:
+    python scripts/fasta_index.py index
+    python scripts/fasta_index.py fetch UHM1171.23069_R.bin.17 k141_123:1001-2000
+"""
+
+import csv
+import gzip
+import mmap
+import os
+import re
+import shutil
+import sys
+from collections import OrderedDict, namedtuple
+
+HQ_MANIFEST = 'data/ruminococcaceae_HQ_manifest.tsv'
+REFERENCE_DIR = 'data/genomes'
+INDEX_CACHE = os.getenv('FASTA_INDEX_CACHE', 'data/fasta_index')
+MAX_OPEN_GENOMES = 256
+
+FaiEntry = namedtuple('FaiEntry', ['name', 'length', 'offset', 'linebases', 'linewidth'])
+
+
+def build_fai(path):
+    """Scan a plain FASTA file and return its FaiEntry list"""
+    entries = []
+    name = None
+    length = offset = linebases = linewidth = 0
+    last_line_short = False
+    position = 0
+
+    def finish():
+        if name is not None:
+            entries.append(FaiEntry(name, length, offset, linebases, linewidth))
+
+    with open(path, 'rb') as f:
+        for line in f:
+            line_start = position
+            position += len(line)
+            if line.startswith(b'>'):
+                finish()
+                name = line[1:].split()[0].decode()
+                length = linebases = linewidth = 0
+                offset = position
+                last_line_short = False
+                continue
+
+            bases = len(line.rstrip(b'\r\n'))
+            if name is None:
+                continue
+            if bases == 0:
+                # Blank lines may only end a record, like a short line
+                last_line_short = True
+                continue
+            if linebases == 0:
+                linebases, linewidth = bases, len(line)
+            elif last_line_short or bases > linebases:
+                raise ValueError(f"{path}: uneven line lengths in {name} at byte {line_start}")
+            last_line_short = bases < linebases
+            length += bases
+    finish()
+    return entries
+
+
+def write_fai(entries, path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        for e in entries:
+            f.write(f"{e.name}\t{e.length}\t{e.offset}\t{e.linebases}\t{e.linewidth}\n")
+    os.replace(tmp_path, path)
+
+
+def read_fai(path):
+    entries = []
+    with open(path) as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            entries.append(FaiEntry(fields[0], *(int(x) for x in fields[1:5])))
+    return entries
+
+
+def parse_region(region):
+    """samtools-style 'contig:start-end' (1-based, inclusive) -> (contig, start0, end)"""
+    match = re.match(r'^(.+?)(?::(\d[\d,]*)(?:-(\d[\d,]*))?)?$', region)
+    if not match:
+        raise ValueError(f"Invalid region: {region}")
+    contig, start, end = match.groups()
+    start = int(start.replace(',', '')) - 1 if start else 0
+    end = int(end.replace(',', '')) if end else None
+    return contig, start, end
+
+
+def _is_stale(cached, source):
+    return not os.path.exists(cached) or os.path.getmtime(cached) < os.path.getmtime(source)
+
+
+class IndexedFasta:
+    """One genome: .fai index plus an mmap of the plain FASTA"""
+
+    def __init__(self, path, key=None, cache_dir=INDEX_CACHE):
+        self.source = path
+        self.key = key or os.path.basename(path).split('.fa')[0]
+        self.cache_dir = cache_dir
+        self.path = self._plain_fasta()
+        self.index = OrderedDict((e.name, e) for e in self._load_index())
+        self._mmap = None
+
+    def _plain_fasta(self):
+        """Path of an uncompressed copy, decompressing gzip input once"""
+        with open(self.source, 'rb') as f:
+            is_gzip = f.read(2) == b'\x1f\x8b'
+        if not is_gzip:
+            return self.source
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        plain = os.path.join(self.cache_dir, f"{self.key}.fa")
+        if _is_stale(plain, self.source):
+            tmp_path = f"{plain}.{os.getpid()}.tmp"
+            with gzip.open(self.source, 'rb') as src, open(tmp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            os.replace(tmp_path, plain)
+        return plain
+
+    def _load_index(self):
+        # Reuse a samtools index next to the file, else our cached one
+        beside = f"{self.path}.fai"
+        if not _is_stale(beside, self.path):
+            return read_fai(beside)
+        cached = os.path.join(self.cache_dir, f"{self.key}.fai")
+        if not _is_stale(cached, self.path):
+            return read_fai(cached)
+
+        entries = build_fai(self.path)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write_fai(entries, cached)
+        return entries
+
+    def _buffer(self):
+        if self._mmap is None:
+            # mmap keeps its own duplicate of the descriptor
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    @property
+    def contigs(self):
+        return list(self.index)
+
+    def length(self, contig):
+        return self.index[contig].length
+
+    def views(self, contig, start=0, end=None):
+        """
+        Yield zero-copy memoryview slices covering [start, end) of a contig
+
+        Slices stop at line breaks, so concatenating them gives the sequence.
+        They stay valid after close() or eviction: the mapping is only
+        released once the last view is.
+        """
+        entry = self.index[contig]
+        end = entry.length if end is None else min(end, entry.length)
+        if start < 0 or start > end:
+            raise ValueError(f"Invalid range {start}-{end} for {contig} ({entry.length} bp)")
+
+        buffer = memoryview(self._buffer())
+        position = start
+        while position < end:
+            line, column = divmod(position, entry.linebases)
+            take = min(entry.linebases - column, end - position)
+            byte = entry.offset + line * entry.linewidth + column
+            yield buffer[byte:byte + take]
+            position += take
+
+    def fetch(self, contig, start=0, end=None):
+        """Sequence of [start, end) (0-based, half-open) as bytes"""
+        return b''.join(self.views(contig, start, end))
+
+    def close(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views from views() are still held; the mapping is freed
+                # with the last of them
+                pass
+            self._mmap = None
+
+
+class GenomeCollection:
+    """
+    Shared access to every genome in the manifest, keyed by bin_id
+
+    Genomes are indexed and mapped on first use; at most max_open stay
+    mapped at once so hundreds of genomes do not exhaust file handles.
+    """
+
+    def __init__(self, paths=None, cache_dir=INDEX_CACHE, max_open=MAX_OPEN_GENOMES):
+        self.paths = dict(paths or {})
+        self.cache_dir = cache_dir
+        self.max_open = max_open
+        self._open = OrderedDict()
+
+    @classmethod
+    def from_manifest(cls, manifest=HQ_MANIFEST, reference_dir=REFERENCE_DIR, **kwargs):
+        """MAGs from a manifest TSV (bin_id, mag_path) plus downloaded references"""
+        collection = cls(**kwargs)
+        with open(manifest, newline='') as f:
+            for row in csv.DictReader(f, delimiter='\t'):
+                collection.paths[row['bin_id']] = row['mag_path']
+        if reference_dir and os.path.isdir(reference_dir):
+            collection.add_reference_dir(reference_dir)
+        return collection
+
+    def add_reference_dir(self, directory):
+        """Add *_genomic.fna(.gz) references keyed by accession"""
+        for name in sorted(os.listdir(directory)):
+            match = re.match(r'^(.+?)_genomic\.fna(\.gz)?$', name)
+            if match:
+                self.paths[match.group(1)] = os.path.join(directory, name)
+
+    def __contains__(self, genome_id):
+        return genome_id in self.paths
+
+    def __len__(self):
+        return len(self.paths)
+
+    def genome(self, genome_id):
+        """IndexedFasta for a bin_id or accession"""
+        if genome_id in self._open:
+            self._open.move_to_end(genome_id)
+            return self._open[genome_id]
+
+        while len(self._open) >= self.max_open:
+            _, oldest = self._open.popitem(last=False)
+            oldest.close()
+        fasta = IndexedFasta(self.paths[genome_id], key=genome_id, cache_dir=self.cache_dir)
+        self._open[genome_id] = fasta
+        return fasta
+
+    def fetch(self, genome_id, contig, start=0, end=None):
+        return self.genome(genome_id).fetch(contig, start, end)
+
+    def fetch_region(self, genome_id, region):
+        """Fetch a samtools-style region string"""
+        contig, start, end = parse_region(region)
+        return self.fetch(genome_id, contig, start, end)
+
+    def build_all(self):
+        """Index every genome; returns (indexed, failed) counts"""
+        indexed = failed = 0
+        for genome_id in self.paths:
+            try:
+                IndexedFasta(self.paths[genome_id], key=genome_id, cache_dir=self.cache_dir)
+                indexed += 1
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️  {genome_id}: {e}")
+                failed += 1
+        return indexed, failed
+
+    def close(self):
+        for fasta in self._open.values():
+            fasta.close()
+        self._open.clear()
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('index', 'fetch'):
+        print("Usage:")
+        print("  python scripts/fasta_index.py index [manifest.tsv]")
+        print("  python scripts/fasta_index.py fetch <bin_id|accession> <contig[:start-end]> [...]")
+        return 1
+
+    if sys.argv[1] == 'index':
+        manifest = sys.argv[2] if len(sys.argv) > 2 else HQ_MANIFEST
+        collection = GenomeCollection.from_manifest(manifest)
+        print(f"🧬 Indexing {len(collection)} genomes into {collection.cache_dir}/...")
+        indexed, failed = collection.build_all()
+        print(f"✓ Indexed {indexed} genomes ({failed} failed)")
+        return 0
+
+    if len(sys.argv) < 4:
+        print("fetch needs a genome id and at least one region")
+        return 1
+    collection = GenomeCollection.from_manifest()
+    genome_id = sys.argv[2]
+    if genome_id not in collection:
+        print(f"Unknown genome: {genome_id}")
+        return 1
+    for region in sys.argv[3:]:
+        seq = collection.fetch_region(genome_id, region).decode()
+        print(f">{genome_id}:{region}")
+        for i in range(0, len(seq), 60):
+            print(seq[i:i + 60])
+    collection.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Latency-aware routing with hedged requests and provider failover
+
+The router keeps a rolling window of latencies and errors per
+(provider, model) route. A request goes to its primary route; if it has
+not answered by that route's p90-based deadline, a hedged duplicate is
+sent to the secondary route and the first good answer wins (the other
+is cancelled). A failed primary fails over to the secondary at once, and
+a route whose recent error rate is too high is tried second.
+
+Each route runs in a daemon thread, so a cancelled request that is still
+waiting on its provider never keeps the process from exiting.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from agent_metrics import percentile
+
+WINDOW = 50                # calls remembered per route
+MIN_SAMPLES = 10           # calls needed before p90 / error rate are trusted
+DEFAULT_DEADLINE = 60.0    # seconds before hedging while a route is unmeasured
+MIN_DEADLINE = 0.5         # never hedge earlier than this
+HEDGE_PERCENTILE = 90      # below the straggler tail, so stragglers are hedged
+HEDGE_FACTOR = 1.5         # deadline = p90 * factor
+MAX_ERROR_RATE = 0.5       # routes above this are demoted to secondary
+SHORT_PROMPT_CHARS = 300   # prompts shorter than this may use the fast model
+
+
+class RequestCancelled(Exception):
+    """Raised inside a provider call whose hedge partner already answered"""
+
+
+class CancelToken(threading.Event):
+    """
+    Event that also runs callbacks (e.g. closing a stream) when set
+
+    A provider call sets `cache_hit` when its answer came from a store or
+    another caller's request, so its near-zero time is not taken as the
+    route's latency.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cache_hit = False
+        self._callbacks = []
+        self._callback_lock = threading.Lock()
+
+    def on_cancel(self, callback):
+        """Call `callback` when the token is set (at once if it already is)"""
+        with self._callback_lock:
+            if not self.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def set(self):
+        with self._callback_lock:
+            if self.is_set():
+                return
+            super().set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass     # aborting is best effort; the caller stops at its next check
+
+
+class RouteStats:
+    """Rolling latency and error window for one provider/model"""
+
+    def __init__(self, window=WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+
+    def add(self, latency, ok):
+        self.outcomes.append(ok)
+        if ok and latency is not None:
+            self.latencies.append(latency)
+
+    def add_censored(self, latency):
+        """A cancelled call: it took at least `latency`, and did not fail"""
+        self.latencies.append(latency)
+
+    @property
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def latency(self, pct):
+        return percentile(list(self.latencies), pct)
+
+
+class ModelRouter:
+    """Chooses routes, hedges slow requests and fails over on errors"""
+
+    def __init__(self, fast_models=None, hedge=True):
+        # provider -> faster model for short prompts
+        self.fast_models = dict(fast_models or {})
+        # False: never send hedged duplicates (failover still happens)
+        self.hedge = hedge
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, route):
+        with self._lock:
+            return self.stats.setdefault(route, RouteStats())
+
+    def record(self, route, latency, ok):
+        self._stats(route).add(latency, ok)
+
+    def seed(self, records):
+        """Warm the windows from earlier call records (see agent_metrics)"""
+        for r in records:
+            if r.get('cache_hit') or r.get('stop_reason') == 'cancelled':
+                continue
+            if r.get('provider') not in ('anthropic', 'gemini'):
+                continue
+            self.record((r['provider'], r['model']), r.get('latency_s'), not r.get('error'))
+
+    def deadline(self, route):
+        """Seconds to wait on a route before sending a hedged duplicate (None: never)"""
+        if not self.hedge:
+            return None
+        stats = self._stats(route)
+        if len(stats.latencies) < MIN_SAMPLES:
+            return DEFAULT_DEADLINE
+        return max(MIN_DEADLINE, stats.latency(HEDGE_PERCENTILE) * HEDGE_FACTOR)
+
+    def healthy(self, route):
+        stats = self._stats(route)
+        return len(stats.outcomes) < MIN_SAMPLES or stats.error_rate <= MAX_ERROR_RATE
+
+    def pick_model(self, provider, default_model, prompt):
+        """Fast model for short prompts when one is configured"""
+        if len(prompt) < SHORT_PROMPT_CHARS and provider in self.fast_models:
+            return self.fast_models[provider]
+        return default_model
+
+    def _timed(self, route, call, cancel, censor_at=0.0):
+        """
+        Run one call and add its outcome to the route's window
+
+        Cache hits are left out. A cancelled call is kept as a censored
+        sample of its elapsed time, at least `censor_at` (the deadline it
+        had already missed), so a straggling route is not remembered only
+        by its fast answers.
+        """
+        start = time.perf_counter()
+        try:
+            result = call(route, cancel)
+        except RequestCancelled:
+            if not cancel.cache_hit:
+                self._stats(route).add_censored(max(time.perf_counter() - start, censor_at))
+            raise
+        except Exception:
+            self.record(route, None, False)
+            raise
+        if not cancel.cache_hit:
+            self.record(route, time.perf_counter() - start, True)
+        return result
+
+    def _start(self, route, call, cancel, censor_at=0.0):
+        """Run one route in a daemon thread; returns its Future"""
+        future = Future()
+
+        def target():
+            try:
+                future.set_result(self._timed(route, call, cancel, censor_at))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=target, name=f"route-{route[0]}", daemon=True).start()
+        return future
+
+    def run(self, primary, secondary, call, log=print):
+        """
+        Run call(route, cancel_token) on the primary route, hedging or
+        failing over to the secondary route (None: no second route);
+        returns the first good answer
+
+        Providers should abort from a cancel_token.on_cancel() callback
+        (e.g. by closing their stream) or check the token while streaming,
+        and raise RequestCancelled once it is set. If every route fails,
+        the primary's error is raised with the secondary's chained to it.
+        """
+        preferred = primary
+        if secondary is not None and not self.healthy(primary) and self.healthy(secondary):
+            log(f"⚠️  {primary[0]} error rate is high; trying {secondary[0]} first\n")
+            primary, secondary = secondary, primary
+
+        deadline = self.deadline(primary)
+        cancels = {primary: CancelToken()}
+        futures = {self._start(primary, call, cancels[primary], deadline or 0.0): primary}
+        backup_started = secondary is None
+
+        def start_backup(reason):
+            cancels[secondary] = CancelToken()
+            futures[self._start(secondary, call, cancels[secondary])] = secondary
+            log(f"{reason} — sending to {secondary[0]} ({secondary[1]})\n")
+
+        if deadline is not None:
+            done, _ = wait(futures, timeout=deadline)
+            if not done and not backup_started:
+                start_backup(f"⏱️  {primary[0]} slower than {deadline:.1f} s deadline")
+                backup_started = True
+
+        errors = {}
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                route = futures.pop(future)
+                error = future.exception()
+                if error is None:
+                    for other in futures.values():
+                        cancels[other].set()
+                    return future.result()
+                errors[route] = error
+                if not backup_started:
+                    start_backup(f"⚠️  {route[0]} failed ({type(error).__name__})")
+                    backup_started = True
+
+        error = errors.pop(preferred)
+        if errors:
+            raise error from next(iter(errors.values()))
+        raise error
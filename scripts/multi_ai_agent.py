@@ -4,80 +4,588 @@ Multi-AI Agent for Ruminococcaceae Analysis
 Orchestrates Claude and Gemini for different tasks
 """
 
+import asyncio
 import os
-from dotenv import load_dotenv
-from anthropic import Anthropic
-import google.generativeai as genai
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agent_metrics import CallLog, call_cost, new_record, read_recent_records
+from model_router import ModelRouter, RequestCancelled
+from request_coalescer import RequestCoalescer, request_key
+from results_store import ResultsStore
+
+# anthropic, google.generativeai and dotenv are imported on first use so
+# that commands which never talk to a provider start instantly.
+API_KEYS_FILE = 'configs/api_keys.env'
+CLAUDE_MODEL = "claude-sonnet-4-20250514"
+GEMINI_MODEL = "gemini-2.5-flash"
+
+# Faster models the router may use for short prompts
+FAST_MODELS = {
+    'anthropic': "claude-3-5-haiku-20241022",
+    'gemini': "gemini-2.5-flash-lite",
+}
+
+# Transient provider errors are retried here (not inside the SDKs) so
+# that every retry shows up in the call records.
+MAX_RETRIES = 2
+RETRY_BACKOFF = 1.0
+
+# Answers cut off at max_tokens are continued up to this many times
+MAX_CONTINUATIONS = 4
+
+# Batch answers cannot be continued, so they get more room up front
+BATCH_MAX_TOKENS = 8000
+
+# A stream that sends nothing for this long is abandoned (per read for
+# Claude, whole request for Gemini's gRPC transport)
+STREAM_TIMEOUT = 120
+
+PROVIDER_KEYS = {'anthropic': 'ANTHROPIC_API_KEY', 'gemini': 'GOOGLE_API_KEY'}
+
+SYSTEM_PROMPTS = {
+    'bioinformatics': "You are an expert bioinformatician specializing in microbiome analysis and metagenomics.",
+    'analysis': "You are a data scientist specializing in microbiome statistics and analysis.",
+    # Only used when a literature task is sent to Claude (e.g. batch mode)
+    'literature': "You are a microbiome research expert.",
+}
+
+
+def literature_prompt(query):
+    """Wrap a literature question with the Ruminococcaceae interpretation brief"""
+    return f"""As a microbiome research expert, provide a critical biological 
+            interpretation with recent literature context: {query}
+            
+            Focus on Ruminococcaceae family and gut microbiome ecology."""
+
+
+def _abort_gemini_stream(response):
+    """Cancel a streaming Gemini call (gRPC streams support cancel())"""
+    abort = getattr(getattr(response, '_iterator', None), 'cancel', None)
+    if abort is not None:
+        abort()
+
+
+_api_keys_loaded = False
+
+
+def load_api_keys():
+    """Load API keys from configs/api_keys.env (once per process)"""
+    global _api_keys_loaded
+    if not _api_keys_loaded:
+        from dotenv import load_dotenv
+        load_dotenv(API_KEYS_FILE)
+        _api_keys_loaded = True
 
-# Load API keys
-load_dotenv('configs/api_keys.env')
 
 class MultiAIAgent:
     """Agent that routes tasks to appropriate AI models"""
     
     def __init__(self):
-        # Initialize AI clients
-        self.claude = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
-        genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-        self.gemini = genai.GenerativeModel('gemini-2.5-flash')
+        # AI clients are created lazily by the claude/gemini properties
+        self._claude = None
+        self._gemini = None
+        self._gemini_models = {}
+        self._client_lock = threading.Lock()
+        
+        # Instrumentation hooks, each called with one record per API call
+        self.hooks = [CallLog()]
+        
+        # Identical concurrent requests share one upstream call (None disables)
+        self.coalescer = RequestCoalescer()
+        self.coalescer.prune()
+        
+        # Latency-aware routing with hedging/failover, warmed from earlier runs
+        self.router = ModelRouter(fast_models=FAST_MODELS)
+        self.router.seed(read_recent_records())
+        
+        # Every answer goes to the SQLite results store (opened on first use);
+        # with AGENT_REUSE_RESULTS=1 exact repeats are answered from it, and
+        # with AGENT_RESULTS_CONTEXT=1 related earlier answers are sent along
+        self._store = None
+        self.reuse_results = os.getenv('AGENT_REUSE_RESULTS') == '1'
+        self.use_history = os.getenv('AGENT_RESULTS_CONTEXT') == '1'
         
         print("✓ Multi-AI Agent initialized")
         print("  - Claude Sonnet 4: Ready for bioinformatics & analysis")
         print("  - Gemini 2.5 Flash: Ready for literature review & biological interpretation")
     
-    def ask_claude(self, prompt, system_prompt=None):
-        """Use Claude for bioinformatics tasks"""
-        messages = [{"role": "user", "content": prompt}]
+    @property
+    def claude(self):
+        """Anthropic client, created on first use"""
+        if self._claude is None:
+            with self._client_lock:
+                if self._claude is None:
+                    load_api_keys()
+                    from anthropic import Anthropic
+                    self._claude = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'),
+                                             max_retries=0)
+        return self._claude
+    
+    @property
+    def gemini(self):
+        """Gemini model, configured on first use"""
+        if self._gemini is None:
+            with self._client_lock:
+                if self._gemini is None:
+                    load_api_keys()
+                    import google.generativeai as genai
+                    options = {}
+                    # ANTHROPIC_BASE_URL is honoured by the Anthropic SDK itself;
+                    # GEMINI_BASE_URL does the same for Gemini (e.g. a local stub)
+                    if os.getenv('GEMINI_BASE_URL'):
+                        options = {"transport": "rest",
+                                   "client_options": {"api_endpoint": os.getenv('GEMINI_BASE_URL')}}
+                    genai.configure(api_key=os.getenv('GOOGLE_API_KEY'), **options)
+                    self._gemini = genai.GenerativeModel(GEMINI_MODEL)
+        return self._gemini
+    
+    @property
+    def store(self):
+        """Results store, opened on first use"""
+        if self._store is None:
+            with self._client_lock:
+                if self._store is None:
+                    self._store = ResultsStore()
+        return self._store
+    
+    def _gemini_model(self, model=GEMINI_MODEL, system_prompt=None):
+        """Gemini model for a model name and system instruction (cached)"""
+        default = self.gemini     # configures the library on first use
+        if model == GEMINI_MODEL and not system_prompt:
+            return default
+        key = (model, system_prompt)
+        with self._client_lock:
+            if key not in self._gemini_models:
+                import google.generativeai as genai
+                self._gemini_models[key] = genai.GenerativeModel(model, system_instruction=system_prompt)
+            return self._gemini_models[key]
+    
+    def _emit(self, record):
+        """Pass a finished call record to every instrumentation hook"""
+        record['cost_usd'] = call_cost(record)
+        for hook in self.hooks:
+            try:
+                hook(record)
+            except Exception as e:
+                print(f"⚠️  Instrumentation hook failed: {e}")
+    
+    def _configured(self, provider):
+        """True if the provider's API key is set"""
+        load_api_keys()
+        return bool(os.getenv(PROVIDER_KEYS[provider]))
+    
+    def _is_transient(self, error):
+        """True for rate limits, timeouts and server-side provider errors"""
+        name = type(error).__name__
+        return name in (
+            'RateLimitError', 'APIConnectionError', 'APITimeoutError',
+            'InternalServerError', 'OverloadedError',
+            'ResourceExhausted', 'ServiceUnavailable', 'DeadlineExceeded',
+            'TooManyRequests',
+        )
+    
+    def _save_response(self, record, request, response):
+        """Store a successful answer; storage problems never fail the call"""
+        try:
+            self.store.add_response(
+                request['prompt'], response, task_type=record['task_type'],
+                provider=record['provider'], model=record['model'],
+                system_prompt=request.get('system'), request_key=request.get('key'),
+                latency_s=record['latency_s'], prompt_tokens=record['prompt_tokens'],
+                response_tokens=record['response_tokens'], script=record['script']
+            )
+        except Exception as e:
+            print(f"⚠️  Could not store response: {e}")
+    
+    def _instrumented_call(self, provider, model, task_type, call, request=None, cancel=None):
+        """
+        Run a provider call with retries and record its timing and usage
+        
+        `call` receives the record and the start time, fills in tokens,
+        ttft_s and stop_reason, and returns the response text. Latency and
+        time-to-first-token include any retries, i.e. what the caller waits.
+        `request` (key, system, prompt) is stored with the answer. Errors
+        raised after `cancel` is set (e.g. a closed stream) are reported
+        as RequestCancelled and not retried.
+        """
+        record = new_record(provider, model, task_type)
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    response = call(record, start)
+                    break
+                except RequestCancelled:
+                    raise
+                except Exception as e:
+                    if cancel is not None and cancel.is_set():
+                        # A hedged request answered first and closed this stream
+                        raise RequestCancelled(f"{model} request cancelled") from e
+                    if record['retries'] >= MAX_RETRIES or not self._is_transient(e):
+                        raise
+                    record['retries'] += 1
+                    record['ttft_s'] = None
+                    time.sleep(RETRY_BACKOFF * 2 ** (record['retries'] - 1))
+            record['latency_s'] = round(time.perf_counter() - start, 3)
+            if request is not None:
+                self._save_response(record, request, response)
+            return response
+        except RequestCancelled:
+            record['stop_reason'] = 'cancelled'
+            raise
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if record['latency_s'] is None:
+                record['latency_s'] = round(time.perf_counter() - start, 3)
+            self._emit(record)
+    
+    def _history_context(self, query):
+        """Related earlier answers from the results store (None if there are none)"""
+        try:
+            context = self.store.related_context(query)
+        except Exception as e:
+            print(f"⚠️  Could not search previous answers: {e}")
+            return None
+        if not context:
+            return None
+        return f"Earlier answers that may be relevant:\n\n{context}"
+    
+    def _coalesced(self, key, provider, model, task_type, fn, cancel=None):
+        """
+        Run fn once for all identical in-flight requests
+        
+        Answers reused from the store or from another caller set
+        `cancel.cache_hit`, so the router does not time them as calls.
+        """
+        start = time.perf_counter()
+        if self.reuse_results:
+            cached = self.store.find_exact(key)
+            if cached is not None:
+                record = new_record(provider, model, task_type)
+                record['cache_hit'] = True
+                record['latency_s'] = round(time.perf_counter() - start, 3)
+                self._emit(record)
+                if cancel is not None:
+                    cancel.cache_hit = True
+                return cached
+        
+        if self.coalescer is None:
+            return fn()
+        
+        try:
+            result, shared = self.coalescer.run(key, fn)
+        except RequestCancelled:
+            if cancel is not None and cancel.is_set():
+                raise
+            # The request we were sharing was a cancelled hedge; make our own
+            return fn()
+        if shared:
+            # The caller that made the request already recorded its usage
+            record = new_record(provider, model, task_type)
+            record['cache_hit'] = True
+            record['latency_s'] = round(time.perf_counter() - start, 3)
+            self._emit(record)
+            if cancel is not None:
+                cancel.cache_hit = True
+        return result
+    
+    def ask_claude(self, prompt, system_prompt=None, task_type=None, max_tokens=2000,
+                   model=CLAUDE_MODEL, cancel=None, context=None):
+        """
+        Use Claude for bioinformatics tasks
+        
+        If the answer stops at max_tokens, the partial answer is sent back as
+        an assistant prefill and Claude continues from where it stopped, so
+        long answers arrive complete instead of silently truncated.
+        Setting `cancel` (a model_router.CancelToken) closes the stream.
+        The SDK only hands over the stream once the response headers
+        arrive, so a cancel before then takes effect at that point; a
+        request cancelled before it is sent is never sent.
+        `context` (e.g. earlier answers) is sent as a separate block ahead
+        of the prompt; the request key and the stored prompt leave it out.
+        """
+        content = prompt
+        if context:
+            content = [{"type": "text", "text": context}, {"type": "text", "text": prompt}]
+        messages = [{"role": "user", "content": content}]
         
         kwargs = {
-            "model": "claude-sonnet-4-20250514",
-            "max_tokens": 2000,
+            "model": model,
+            "max_tokens": max_tokens,
             "messages": messages
         }
         
         if system_prompt:
             kwargs["system"] = system_prompt
         
-        response = self.claude.messages.create(**kwargs)
-        return response.content[0].text
+        # Text received so far; kept across retries so a failed
+        # continuation does not repeat the parts already answered
+        answer = [""]
+        
+        def call(record, start):
+            while True:
+                request = dict(kwargs)
+                if answer[0]:
+                    # The API rejects a prefill that ends in whitespace
+                    answer[0] = answer[0].rstrip()
+                    request["messages"] = messages + [{"role": "assistant", "content": answer[0]}]
+                
+                if cancel is not None and cancel.is_set():
+                    raise RequestCancelled(f"{model} request cancelled")
+                # Stream so time-to-first-token can be measured
+                with self.claude.messages.stream(timeout=STREAM_TIMEOUT, **request) as stream:
+                    if cancel is not None:
+                        cancel.on_cancel(stream.close)
+                    for _ in stream.text_stream:
+                        if cancel is not None and cancel.is_set():
+                            raise RequestCancelled(f"{model} request cancelled")
+                        if record['ttft_s'] is None:
+                            record['ttft_s'] = round(time.perf_counter() - start, 3)
+                    response = stream.get_final_message()
+                
+                usage = response.usage
+                record['prompt_tokens'] += usage.input_tokens
+                record['response_tokens'] += usage.output_tokens
+                record['cache_read_tokens'] += getattr(usage, 'cache_read_input_tokens', None) or 0
+                record['stop_reason'] = response.stop_reason
+                answer[0] += "".join(block.text for block in response.content if block.type == "text")
+                
+                if response.stop_reason != "max_tokens" or record['continuations'] >= MAX_CONTINUATIONS:
+                    return answer[0]
+                record['continuations'] += 1
+        
+        key = request_key('anthropic', model, system_prompt, prompt, max_tokens)
+        return self._coalesced(
+            key, 'anthropic', model, task_type,
+            lambda: self._instrumented_call('anthropic', model, task_type, call,
+                                            {'key': key, 'system': system_prompt, 'prompt': prompt},
+                                            cancel),
+            cancel
+        )
     
-    def ask_gemini(self, prompt):
-        """Use Gemini for literature review and biological interpretation"""
-        response = self.gemini.generate_content(prompt)
-        return response.text
+    def ask_gemini(self, prompt, task_type=None, model=GEMINI_MODEL, system_prompt=None, cancel=None,
+                   context=None):
+        """
+        Use Gemini for literature review and biological interpretation
+        
+        As in ask_claude(), `cancel` aborts the stream once
+        generate_content() has returned it, and `context` is sent as a
+        separate part ahead of the prompt.
+        """
+        contents = {'role': 'user', 'parts': [context, prompt]} if context else prompt
+        
+        def call(record, start):
+            if cancel is not None and cancel.is_set():
+                raise RequestCancelled(f"{model} request cancelled")
+            gemini = self._gemini_model(model, system_prompt)
+            response = gemini.generate_content(contents, stream=True,
+                                               request_options={'timeout': STREAM_TIMEOUT})
+            if cancel is not None:
+                cancel.on_cancel(lambda: _abort_gemini_stream(response))
+            for _ in response:
+                if cancel is not None and cancel.is_set():
+                    raise RequestCancelled(f"{model} request cancelled")
+                if record['ttft_s'] is None:
+                    record['ttft_s'] = round(time.perf_counter() - start, 3)
+            
+            usage = response.usage_metadata
+            record['prompt_tokens'] = usage.prompt_token_count
+            record['response_tokens'] = usage.candidates_token_count
+            record['cache_read_tokens'] = getattr(usage, 'cached_content_token_count', 0) or 0
+            if response.candidates:
+                record['stop_reason'] = response.candidates[0].finish_reason.name
+            return response.text
+        
+        key = request_key('gemini', model, system_prompt, prompt)
+        return self._coalesced(
+            key, 'gemini', model, task_type,
+            lambda: self._instrumented_call('gemini', model, task_type, call,
+                                            {'key': key, 'system': system_prompt, 'prompt': prompt},
+                                            cancel),
+            cancel
+        )
     
-    def analyze_ruminococcaceae(self, task_type, query):
+    def analyze_ruminococcaceae(self, task_type, query, verbose=True):
         """
         Route Ruminococcaceae analysis tasks to appropriate AI
         
         Args:
             task_type: 'bioinformatics', 'literature', or 'analysis'
             query: The question or task to perform
+            verbose: Print the task banner and chosen model
         """
-        print(f"\n{'='*60}")
-        print(f"Task Type: {task_type.upper()}")
-        print(f"{'='*60}\n")
+        say = print if verbose else (lambda *args: None)
+        say(f"\n{'='*60}")
+        say(f"Task Type: {task_type.upper()}")
+        say(f"{'='*60}\n")
         
         if task_type == 'bioinformatics':
-            print("🔬 Using Claude for bioinformatics pipeline...\n")
-            system = "You are an expert bioinformatician specializing in microbiome analysis and metagenomics."
-            return self.ask_claude(query, system_prompt=system)
+            say("🔬 Using Claude for bioinformatics pipeline...\n")
+            primary, secondary = 'anthropic', 'gemini'
         
         elif task_type == 'literature':
-            print("📚 Using Gemini for literature review...\n")
-            enhanced_query = f"""As a microbiome research expert, provide a critical biological 
-            interpretation with recent literature context: {query}
-            
-            Focus on Ruminococcaceae family and gut microbiome ecology."""
-            return self.ask_gemini(enhanced_query)
+            say("📚 Using Gemini for literature review...\n")
+            primary, secondary = 'gemini', 'anthropic'
         
         elif task_type == 'analysis':
-            print("📊 Using Claude for statistical analysis...\n")
-            system = "You are a data scientist specializing in microbiome statistics and analysis."
-            return self.ask_claude(query, system_prompt=system)
+            say("📊 Using Claude for statistical analysis...\n")
+            primary, secondary = 'anthropic', 'gemini'
         
         else:
             return "Error: task_type must be 'bioinformatics', 'literature', or 'analysis'"
+        
+        # Earlier answers travel next to the query, not inside it, so the
+        # query alone decides the model, the request key and what is stored
+        context = self._history_context(query) if self.use_history else None
+        
+        # Either provider can answer any task: if the preferred one is slow
+        # or failing, the router hedges or fails over to the other (when
+        # that one has an API key)
+        defaults = {'anthropic': CLAUDE_MODEL, 'gemini': GEMINI_MODEL}
+        routes = {
+            provider: (provider, self.router.pick_model(provider, defaults[provider], query))
+            for provider in (primary, secondary)
+        }
+        
+        def call(route, cancel):
+            provider, model = route
+            if task_type == 'literature':
+                prompt = literature_prompt(query)
+                system = SYSTEM_PROMPTS['literature'] if provider == 'anthropic' else None
+            else:
+                prompt, system = query, SYSTEM_PROMPTS[task_type]
+            if provider == 'anthropic':
+                return self.ask_claude(prompt, system_prompt=system, task_type=task_type,
+                                       model=model, cancel=cancel, context=context)
+            return self.ask_gemini(prompt, task_type=task_type, model=model,
+                                   system_prompt=system, cancel=cancel, context=context)
+        
+        secondary_route = routes[secondary] if self._configured(secondary) else None
+        return self.router.run(routes[primary], secondary_route, call, log=say)
+    
+    async def analyze_ruminococcaceae_async(self, task_type, query):
+        """asyncio version of analyze_ruminococcaceae (runs in a worker thread)"""
+        return await asyncio.to_thread(self.analyze_ruminococcaceae, task_type, query, False)
+    
+    def analyze_in_parts(self, task_type, context, parts, max_workers=None):
+        """
+        Answer a multi-part request as parallel sub-requests
+        
+        Each part is sent together with the shared context and the answers
+        are joined in the original order, so the result reads like one long
+        answer but takes only as long as the slowest part.
+        
+        Args:
+            task_type: 'bioinformatics', 'literature', or 'analysis'
+            context: Background shared by every part
+            parts: List of part-specific instructions, in output order
+            max_workers: Parts sent at once (default: all of them)
+        """
+        if task_type not in SYSTEM_PROMPTS:
+            return "Error: task_type must be 'bioinformatics', 'literature', or 'analysis'"
+        
+        print(f"\n{'='*60}")
+        print(f"Task Type: {task_type.upper()} ({len(parts)} parts in parallel)")
+        print(f"{'='*60}\n")
+        
+        queries = [
+            f"{context}\n\nAnswer ONLY the following part; the other parts are "
+            f"handled separately:\n{part}"
+            for part in parts
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers or len(parts) or 1) as pool:
+            answers = list(pool.map(
+                lambda query: self.analyze_ruminococcaceae(task_type, query, verbose=False),
+                queries
+            ))
+        return "\n\n".join(answer.strip() for answer in answers)
+    
+    def submit_batch(self, task_type, queries, max_tokens=BATCH_MAX_TOKENS):
+        """
+        Submit many queries as one Anthropic Message Batch
+        
+        Batches run at lower priority and cost than interactive calls, so
+        they suit hundreds of per-genus/per-MAG interpretations. All task
+        types go to Claude here; 'literature' queries keep their Gemini brief.
+        Truncated answers cannot be continued as in ask_claude(), hence the
+        larger max_tokens.
+        
+        Args:
+            task_type: 'bioinformatics', 'literature', or 'analysis'
+            queries: Dict of custom_id -> query (ids: 1-64 chars of [A-Za-z0-9_-])
+        
+        Returns:
+            The batch id, used by wait_for_batch() and batch_results()
+        """
+        if task_type not in SYSTEM_PROMPTS:
+            raise ValueError("task_type must be 'bioinformatics', 'literature', or 'analysis'")
+        
+        requests = []
+        for custom_id, query in queries.items():
+            prompt = literature_prompt(query) if task_type == 'literature' else query
+            requests.append({
+                "custom_id": custom_id,
+                "params": {
+                    "model": CLAUDE_MODEL,
+                    "max_tokens": max_tokens,
+                    "system": SYSTEM_PROMPTS[task_type],
+                    "messages": [{"role": "user", "content": prompt}],
+                },
+            })
+        
+        batch = self.claude.messages.batches.create(requests=requests)
+        print(f"📦 Submitted batch {batch.id} ({len(requests)} requests)")
+        return batch.id
+    
+    def wait_for_batch(self, batch_id, poll_interval=30, timeout=None):
+        """Poll a batch until it has ended; returns the final batch object"""
+        start = time.time()
+        while True:
+            batch = self.claude.messages.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            print(f"  ⏳ {batch_id}: {batch.processing_status} "
+                  f"(processing {counts.processing}, succeeded {counts.succeeded}, "
+                  f"errored {counts.errored})")
+            if batch.processing_status == "ended":
+                return batch
+            if timeout is not None and time.time() - start > timeout:
+                raise TimeoutError(f"Batch {batch_id} still {batch.processing_status} after {timeout} s")
+            time.sleep(poll_interval)
+    
+    def batch_results(self, batch_id, task_type=None, stop_reasons=None):
+        """
+        Fetch results of an ended batch
+        
+        Args:
+            stop_reasons: Optional dict filled with custom_id -> stop_reason
+                ('max_tokens' marks an answer that was cut off)
+        
+        Returns:
+            Dict of custom_id -> response text (None for errored/expired requests)
+        """
+        results = {}
+        for entry in self.claude.messages.batches.results(batch_id):
+            record = new_record('anthropic-batch', CLAUDE_MODEL, task_type)
+            record['stop_reason'] = entry.result.type
+            if entry.result.type == "succeeded":
+                message = entry.result.message
+                record['prompt_tokens'] = message.usage.input_tokens
+                record['response_tokens'] = message.usage.output_tokens
+                record['stop_reason'] = message.stop_reason
+                results[entry.custom_id] = "".join(
+                    block.text for block in message.content if block.type == "text"
+                )
+            else:
+                record['error'] = entry.result.type
+                results[entry.custom_id] = None
+            if stop_reasons is not None:
+                stop_reasons[entry.custom_id] = record['stop_reason']
+            self._emit(record)
+        return results
 
 
 def main():
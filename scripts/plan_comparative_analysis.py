@@ -4,7 +4,7 @@ Plan comparative genomics strategy for Ruminococcaceae with resource requirement
 """
 
 from ruminococcaceae_analysis import RuminococcaceaeAnalyzer
-import os
+from results_store import save_report
 
 analyzer = RuminococcaceaeAnalyzer()
 
@@ -50,25 +50,16 @@ print(strategy)
 print("\n\n[PART 2: Comparative Analysis Pipeline & Resource Requirements]")
 print("-"*70)
 
-analysis_plan = analyzer.agent.analyze_ruminococcaceae(
-    'bioinformatics',
-    """I'll compare 284 herptile Ruminococcaceae MAGs (836 MB) against reference genomes 
+# Seven steps with a SLURM block each do not fit in one response, so each
+# step is requested in parallel and the answers are stitched back in order
+analysis_context = """I'll compare 284 herptile Ruminococcaceae MAGs (836 MB) against reference genomes 
     from mammals, birds, and possibly environment.
     
-    For EACH major analysis step, I need exact resource requirements for SLURM:
-    
-    ANALYSES NEEDED:
-    1. Phylogenomic tree construction (concatenated marker genes? FastTree? IQ-TREE?)
-    2. Functional annotation (Prokka? eggNOG-mapper? DRAM?)
-    3. CAZyme profiling with dbCAN
-    4. Metabolic pathway reconstruction (KEGG mapper? MetaCyc?)
-    5. Pan-genome analysis (Roary? PIRATE? Panaroo?)
-    6. Average Nucleotide Identity calculations (FastANI? pyani?)
-    7. Comparative genomics (OrthoFinder? ProteinOrtho?)
+    For EACH major analysis step, I need exact resource requirements for SLURM.
     
     CRITICAL: For ~400-500 total genomes (284 herptile + 200 reference), provide:
     
-    For EACH step format as:
+    Format the step as:
     ## Step X: [Analysis Name]
     Tool: [name and version]
     Memory: X GB RAM
@@ -83,6 +74,21 @@ analysis_plan = analyzer.agent.analyze_ruminococcaceae(
     [command]
 ```
     """
+
+analysis_steps = [
+    "Phylogenomic tree construction (concatenated marker genes? FastTree? IQ-TREE?)",
+    "Functional annotation (Prokka? eggNOG-mapper? DRAM?)",
+    "CAZyme profiling with dbCAN",
+    "Metabolic pathway reconstruction (KEGG mapper? MetaCyc?)",
+    "Pan-genome analysis (Roary? PIRATE? Panaroo?)",
+    "Average Nucleotide Identity calculations (FastANI? pyani?)",
+    "Comparative genomics (OrthoFinder? ProteinOrtho?)",
+]
+
+analysis_plan = analyzer.agent.analyze_in_parts(
+    'bioinformatics',
+    analysis_context,
+    [f"## Step {i}: {step}" for i, step in enumerate(analysis_steps, 1)]
 )
 
 print(analysis_plan)
@@ -124,26 +130,27 @@ stats_plan = analyzer.agent.analyze_ruminococcaceae(
 
 print(stats_plan)
 
-# Save everything
-os.makedirs('results', exist_ok=True)
-with open('results/comparative_genomics_plan.txt', 'w') as f:
-    f.write("="*70 + "\n")
-    f.write("COMPARATIVE GENOMICS STRATEGY WITH RESOURCE REQUIREMENTS\n")
-    f.write("="*70 + "\n\n")
-    f.write("Dataset: 284 high-quality herptile Ruminococcaceae MAGs (836 MB)\n")
-    f.write("Target: ~400-500 total genomes (284 herptile + 200 reference)\n")
-    f.write("="*70 + "\n\n")
-    f.write("[PART 1: Download Strategy & Requirements]\n")
-    f.write("-"*70 + "\n")
-    f.write(strategy)
-    f.write("\n\n")
-    f.write("[PART 2: Comparative Analysis Pipeline & Resources]\n")
-    f.write("-"*70 + "\n")
-    f.write(analysis_plan)
-    f.write("\n\n")
-    f.write("[PART 3: Statistical Analysis & Visualization Resources]\n")
-    f.write("-"*70 + "\n")
-    f.write(stats_plan)
+# Save everything (results/ text file plus a copy in the results store)
+report = "".join([
+    "="*70 + "\n",
+    "COMPARATIVE GENOMICS STRATEGY WITH RESOURCE REQUIREMENTS\n",
+    "="*70 + "\n\n",
+    "Dataset: 284 high-quality herptile Ruminococcaceae MAGs (836 MB)\n",
+    "Target: ~400-500 total genomes (284 herptile + 200 reference)\n",
+    "="*70 + "\n\n",
+    "[PART 1: Download Strategy & Requirements]\n",
+    "-"*70 + "\n",
+    strategy,
+    "\n\n",
+    "[PART 2: Comparative Analysis Pipeline & Resources]\n",
+    "-"*70 + "\n",
+    analysis_plan,
+    "\n\n",
+    "[PART 3: Statistical Analysis & Visualization Resources]\n",
+    "-"*70 + "\n",
+    stats_plan,
+])
+save_report('comparative_genomics_plan.txt', report)
 
 # Create resource summary
 print("\n\n" + "="*70)
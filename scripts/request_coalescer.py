@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Coalesce identical in-flight requests into one upstream call
+
+Within a process, concurrent callers (threads, or asyncio tasks running
+in threads) with the same key wait on the first caller's future. Across
+processes, the first caller holds an exclusive lock file while it calls
+the provider and writes the result next to the lock; processes that were
+blocked on the same lock read that result instead of calling again.
+Nothing is reused once a call has finished: a caller that gets the lock
+without waiting always makes a fresh call.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import fcntl
+except ImportError:      # Windows: coalesce within the process only
+    fcntl = None
+
+COALESCE_DIR = os.getenv('AGENT_COALESCE_DIR', 'logs/inflight')
+RESULT_MAX_AGE = 600     # prune() deletes result/lock files older than this (s)
+
+
+def request_key(*parts):
+    """Stable hash of everything that determines a provider response"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class RequestCoalescer:
+    """Share one upstream call among concurrent identical requests"""
+
+    def __init__(self, cache_dir=COALESCE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def run(self, key, fn):
+        """
+        Return (result, shared) for the request identified by `key`
+
+        `fn` is only called if no identical request is in flight; `shared`
+        is True when the result came from another caller.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result, shared = self._run_across_processes(key, fn)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, shared
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _run_across_processes(self, key, fn):
+        if fcntl is None or not self.cache_dir:
+            return fn(), False
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        lock_path = os.path.join(self.cache_dir, f"{key}.lock")
+        result_path = os.path.join(self.cache_dir, f"{key}.json")
+
+        with open(lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                waited = False
+            except BlockingIOError:
+                # Another process is making the same call; wait for its answer
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                waited = True
+            try:
+                if waited:
+                    entry = self._read_result(result_path)
+                    if entry is not None:
+                        return entry['result'], True
+                else:
+                    # Left over from an earlier, finished call
+                    self._remove(result_path)
+
+                result = fn()
+                tmp_path = f"{result_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({'created': time.time(), 'result': result}, f)
+                os.replace(tmp_path, result_path)
+                return result, False
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_result(self, path):
+        """Entry written by the process we waited on (None if it failed)"""
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if 'result' in entry else None
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def prune(self, max_age=RESULT_MAX_AGE):
+        """Delete old result files, and old lock files no process is holding"""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        cutoff = time.time() - max_age
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                if name.endswith('.json') or name.endswith('.tmp'):
+                    os.remove(path)
+                elif name.endswith('.lock'):
+                    self._remove_idle_lock(path)
+            except OSError:
+                pass
+
+    def _remove_idle_lock(self, path):
+        if fcntl is None:
+            os.remove(path)
+            return
+        with open(path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return       # a call is in flight
+            try:
+                os.remove(path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+SQLite store for every prompt/response and every saved report
+
+All answers from MultiAIAgent are recorded with task type, model,
+script, timestamp and a hash of the HQ manifest they were asked
+against. An FTS5 index over prompts and responses makes earlier answers
+searchable, and exact repeats can be served from the store
+(AGENT_REUSE_RESULTS=1). Reports written to results/*.txt are stored
+too, so the text files can be regenerated with `export`.
+
+Usage:
+    python scripts/results_store.py search "CAZyme dbCAN memory"
+    python scripts/results_store.py show 42
+    python scripts/results_store.py export [out_dir]
+    python scripts/results_store.py import [results_dir]
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+RESULTS_DB = os.getenv('RESULTS_DB', 'results/agent_results.db')
+HQ_MANIFEST = 'data/ruminococcaceae_HQ_manifest.tsv'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    script TEXT,
+    task_type TEXT,
+    provider TEXT,
+    model TEXT,
+    system_prompt TEXT,
+    prompt TEXT NOT NULL,
+    response TEXT NOT NULL,
+    request_key TEXT,
+    manifest_hash TEXT,
+    latency_s REAL,
+    prompt_tokens INTEGER,
+    response_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS responses_key ON responses(request_key, manifest_hash);
+CREATE INDEX IF NOT EXISTS responses_task ON responses(task_type, created_at);
+CREATE INDEX IF NOT EXISTS responses_script ON responses(script, created_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS responses_fts USING fts5(
+    prompt, response, content='responses', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS responses_ai AFTER INSERT ON responses BEGIN
+    INSERT INTO responses_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response);
+END;
+CREATE TRIGGER IF NOT EXISTS responses_ad AFTER DELETE ON responses BEGIN
+    INSERT INTO responses_fts(responses_fts, rowid, prompt, response)
+    VALUES ('delete', old.id, old.prompt, old.response);
+END;
+
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    script TEXT,
+    manifest_hash TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_name ON reports(name, created_at);
+"""
+
+_manifest_hashes = {}
+
+
+def manifest_hash(path=HQ_MANIFEST):
+    """Short sha256 of the manifest contents (None if it does not exist)"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _manifest_hashes.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    _manifest_hashes[path] = (mtime, digest)
+    return digest
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query that matches any of its words"""
+    words = re.findall(r'\w+', text)
+    return ' OR '.join(f'"{word}"' for word in words)
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _script():
+    return os.path.basename(sys.argv[0]) or 'interactive'
+
+
+class ResultsStore:
+    """Thread-safe handle on the results database"""
+
+    def __init__(self, path=RESULTS_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # -- responses --------------------------------------------------------
+
+    def add_response(self, prompt, response, task_type=None, provider=None, model=None,
+                     system_prompt=None, request_key=None, latency_s=None,
+                     prompt_tokens=None, response_tokens=None, script=None):
+        """Store one answer; returns its id"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO responses (created_at, script, task_type, provider, model, system_prompt, "
+                "prompt, response, request_key, manifest_hash, latency_s, prompt_tokens, response_tokens) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (_now(), script or _script(), task_type, provider, model, system_prompt, prompt,
+                 response, request_key, manifest_hash(), latency_s, prompt_tokens, response_tokens)
+            )
+            return cursor.lastrowid
+
+    def find_exact(self, request_key, same_manifest=True):
+        """Latest stored answer to an identical request (None if there is none)"""
+        sql = "SELECT response FROM responses WHERE request_key = ?"
+        params = [request_key]
+        if same_manifest:
+            sql += " AND manifest_hash IS ?"
+            params.append(manifest_hash())
+        sql += " ORDER BY id DESC LIMIT 1"
+        with self._lock:
+            row = self.conn.execute(sql, params).fetchone()
+        return row['response'] if row else None
+
+    def search(self, text, limit=10, task_type=None):
+        """Full-text search over prompts and responses, best matches first"""
+        query = fts_query(text)
+        if not query:
+            return []
+        sql = (
+            "SELECT r.id, r.created_at, r.script, r.task_type, r.model, "
+            "snippet(responses_fts, 1, '[', ']', ' ... ', 24) AS snippet "
+            "FROM responses_fts JOIN responses r ON r.id = responses_fts.rowid "
+            "WHERE responses_fts MATCH ?"
+        )
+        params = [query]
+        if task_type:
+            sql += " AND r.task_type = ?"
+            params.append(task_type)
+        sql += " ORDER BY bm25(responses_fts) LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def get(self, response_id):
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM responses WHERE id = ?", (response_id,)).fetchone()
+        return dict(row) if row else None
+
+    def related_context(self, text, limit=2, max_chars=3000):
+        """Earlier answers related to `text`, formatted to send along with a prompt"""
+        blocks = []
+        for hit in self.search(text, limit=limit):
+            answer = self.get(hit['id'])['response']
+            blocks.append(f"[Previous answer #{hit['id']} ({hit['created_at']}, {hit['task_type']})]\n"
+                          f"{answer[:max_chars]}")
+        return "\n\n".join(blocks)
+
+    # -- reports ----------------------------------------------------------
+
+    def add_report(self, name, body, script=None):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO reports (name, created_at, script, manifest_hash, body) VALUES (?, ?, ?, ?, ?)",
+                (name, _now(), script or _script(), manifest_hash(), body)
+            )
+
+    def latest_reports(self):
+        """Most recent body of every report name"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT name, created_at, body FROM reports WHERE id IN "
+                "(SELECT MAX(id) FROM reports GROUP BY name) ORDER BY name"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def export_reports(self, out_dir='results'):
+        """Regenerate results/<name> text files from the store"""
+        written = []
+        for report in self.latest_reports():
+            path = os.path.join(out_dir, report['name'])
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(report['body'])
+            written.append(path)
+        return written
+
+    def import_reports(self, results_dir='results'):
+        """Store existing results/*.txt reports that are not in the store yet"""
+        known = {(r['name'], r['body']) for r in self.latest_reports()}
+        imported = []
+        for name in sorted(os.listdir(results_dir)):
+            if not name.endswith('.txt'):
+                continue
+            with open(os.path.join(results_dir, name)) as f:
+                body = f.read()
+            if (name, body) not in known:
+                self.add_report(name, body, script='import')
+                imported.append(name)
+        return imported
+
+
+def save_report(name, body, results_dir='results'):
+    """Write results/<name> and keep a copy of the report in the store"""
+    os.makedirs(results_dir, exist_ok=True)
+    with open(os.path.join(results_dir, name), 'w') as f:
+        f.write(body)
+    try:
+        store = ResultsStore()
+        store.add_report(name, body)
+        store.close()
+    except sqlite3.Error as e:
+        print(f"⚠️  Report not stored in {RESULTS_DB}: {e}")
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('search', 'show', 'export', 'import'):
+        print("Usage:")
+        print("  python scripts/results_store.py search <words...>")
+        print("  python scripts/results_store.py show <id>")
+        print("  python scripts/results_store.py export [out_dir]")
+        print("  python scripts/results_store.py import [results_dir]")
+        return 1
+
+    store = ResultsStore()
+    command, args = sys.argv[1], sys.argv[2:]
+
+    if command == 'search':
+        hits = store.search(' '.join(args))
+        if not hits:
+            print("No matching answers.")
+        for hit in hits:
+            print(f"\n#{hit['id']}  {hit['created_at']}  {hit['task_type'] or '-'}  "
+                  f"{hit['model'] or '-'}  ({hit['script']})")
+            print(f"   {hit['snippet']}")
+
+    elif command == 'show':
+        row = store.get(int(args[0])) if args else None
+        if row is None:
+            print("No such answer.")
+            return 1
+        print("="*70)
+        print(f"#{row['id']}  {row['created_at']}  {row['task_type']}  {row['model']}  ({row['script']})")
+        print("="*70)
+        print(f"\n[PROMPT]\n{row['prompt']}\n\n[RESPONSE]\n{row['response']}")
+
+    elif command == 'export':
+        out_dir = args[0] if args else 'results'
+        for path in store.export_reports(out_dir):
+            print(f"✓ {path}")
+
+    elif command == 'import':
+        results_dir = args[0] if args else 'results'
+        imported = store.import_reports(results_dir)
+        print(f"✓ Imported {len(imported)} report(s) from {results_dir}/")
+
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
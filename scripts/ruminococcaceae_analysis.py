@@ -3,9 +3,9 @@
 Custom analysis workflows for Ruminococcaceae project
 """
 
-import os
 import sys
 from multi_ai_agent import MultiAIAgent
+from results_store import save_report
 
 class RuminococcaceaeAnalyzer:
     """Specialized analyzer for Ruminococcaceae research"""
@@ -84,11 +84,13 @@ def interactive_mode():
     print("  2 - Literature review")
     print("  3 - Statistical analysis design")
     print("  4 - Compare to Lachnospiraceae")
+    print("  5 - Search previous answers")
+    print("  h - Use related previous answers as context (on/off)")
     print("  q - Quit")
     print("="*60)
     
     while True:
-        choice = input("\nWhat would you like to do? (1-4 or q): ").strip()
+        choice = input("\nWhat would you like to do? (1-5, h or q): ").strip()
         
         if choice == 'q':
             print("\n👋 Goodbye!")
@@ -119,6 +121,27 @@ def interactive_mode():
             result = analyzer.compare_to_lachnospiraceae(aspect)
             print(result)
             
+        elif choice == 'h':
+            analyzer.agent.use_history = not analyzer.agent.use_history
+            state = "on" if analyzer.agent.use_history else "off"
+            print(f"📎 Previous answers as context: {state}")
+            continue
+            
+        elif choice == '5':
+            words = input("Search for: ")
+            hits = analyzer.agent.store.search(words, limit=5)
+            if not hits:
+                print("No matching answers.")
+                continue
+            for hit in hits:
+                print(f"\n#{hit['id']}  {hit['created_at']}  {hit['task_type']}")
+                print(f"   {hit['snippet']}")
+            answer_id = input("\nShow answer # (Enter to skip): ").strip()
+            if not answer_id.isdigit() or analyzer.agent.store.get(int(answer_id)) is None:
+                continue
+            result = analyzer.agent.store.get(int(answer_id))['response']
+            print(result)
+            
         else:
             print("Invalid choice. Please try again.")
         
@@ -126,9 +149,7 @@ def interactive_mode():
         save = input("\n💾 Save this output to file? (y/n): ").strip().lower()
         if save == 'y':
             filename = input("Filename (will be saved in results/): ")
-            os.makedirs('results', exist_ok=True)
-            with open(f'results/{filename}', 'w') as f:
-                f.write(result)
+            save_report(filename, result)
             print(f"✓ Saved to results/{filename}")
 
 
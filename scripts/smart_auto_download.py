@@ -4,21 +4,47 @@ SMART AI Agent: Inspects data first, then solves problems
 """
 
 from ruminococcaceae_analysis import RuminococcaceaeAnalyzer
+from results_store import save_report
 import pandas as pd
 import subprocess
 import os
 
-analyzer = RuminococcaceaeAnalyzer()
 
-print("\n" + "="*70)
-print("🧠 SMART AI AGENT: Autonomous problem solving")
-print("="*70 + "\n")
+def filter_reference_genomes(metadata='reference_genomes/ruminococcaceae_metadata.tsv',
+                             out_dir='data/filtered_genomes', min_completeness=90,
+                             max_contamination=5, top_n=300):
+    """
+    Quality filter + top-N selection of the header-less GTDB metadata
 
-# STEP 1: Inspect the data first
-print("[Step 1] Inspecting GTDB metadata structure...")
-df = pd.read_csv('reference_genomes/ruminococcaceae_metadata.tsv', sep='\t', nrows=3)
+    The same filter the generated code is asked to implement: column 0 is
+    the accession, 2 completeness and 3 contamination. Writes
+    high_quality_genomes.tsv and accession_list.txt to out_dir and returns
+    (rows read, genomes selected).
+    """
+    df = pd.read_csv(metadata, sep='\t', header=None, low_memory=False)
+    passed = df[(df[2] > min_completeness) & (df[3] < max_contamination)]
+    top = passed.sort_values(2, ascending=False).head(top_n)
 
-data_info = f"""
+    os.makedirs(out_dir, exist_ok=True)
+    top.to_csv(f"{out_dir}/high_quality_genomes.tsv", sep='\t', header=False, index=False)
+    top[0].to_csv(f"{out_dir}/accession_list.txt", header=False, index=False)
+    return len(df), len(top)
+
+
+if __name__ == "__main__":
+    # Module-level on purpose: exec() below runs the generated code
+    # against these globals (pd, os, df, ...)
+    analyzer = RuminococcaceaeAnalyzer()
+
+    print("\n" + "="*70)
+    print("🧠 SMART AI AGENT: Autonomous problem solving")
+    print("="*70 + "\n")
+
+    # STEP 1: Inspect the data first
+    print("[Step 1] Inspecting GTDB metadata structure...")
+    df = pd.read_csv('reference_genomes/ruminococcaceae_metadata.tsv', sep='\t', nrows=3)
+
+    data_info = f"""
 GTDB Metadata Structure:
 - Total columns: {len(df.columns)}
 - Sample columns: {list(df.columns[:20])}
@@ -26,14 +52,14 @@ GTDB Metadata Structure:
 {df.head(3).to_string()}
 """
 
-print(data_info)
+    print(data_info)
 
-# STEP 2: Ask AI to write code that works with THIS data
-print("\n[Step 2] Asking AI to write solution for THIS EXACT data structure...")
+    # STEP 2: Ask AI to write code that works with THIS data
+    print("\n[Step 2] Asking AI to write solution for THIS EXACT data structure...")
 
-solution = analyzer.agent.analyze_ruminococcaceae(
-    'bioinformatics',
-    f"""I have GTDB metadata with the following structure:
+    solution = analyzer.agent.analyze_ruminococcaceae(
+        'bioinformatics',
+        f"""I have GTDB metadata with the following structure:
     
 {data_info}
 
@@ -60,56 +86,55 @@ Use this format:
 [your code here]
 ```
 """
-)
+    )
 
-print(solution)
+    print(solution)
 
-# STEP 3: Extract and run the Python code
-print("\n[Step 3] Extracting and executing solution...")
+    # STEP 3: Extract and run the Python code
+    print("\n[Step 3] Extracting and executing solution...")
 
-import re
-code_match = re.search(r'```python\n(.*?)```', solution, re.DOTALL)
+    import re
+    code_match = re.search(r'```python\n(.*?)```', solution, re.DOTALL)
 
-if code_match:
-    code = code_match.group(1)
-    
-    # Save code
-    with open('scripts/filter_genomes_auto.py', 'w') as f:
-        f.write(code)
-    
-    print("✓ Code extracted and saved")
-    
-    # Execute code
-    print("\n[Step 4] Running the code...")
-    try:
-        exec(code)
-        print("✅ Code executed successfully!")
-        
-        # Verify results
-        if os.path.exists('data/filtered_genomes/accession_list.txt'):
-            count = len(open('data/filtered_genomes/accession_list.txt').readlines())
-            print(f"\n✅ SUCCESS! Filtered {count} genomes")
-            print(f"   Files created:")
-            print(f"   - data/filtered_genomes/high_quality_genomes.tsv")
-            print(f"   - data/filtered_genomes/accession_list.txt")
-            
-            if count > 0:
-                print(f"\n🚀 Ready to download!")
-                print(f"   Next: sbatch jobs/02_download_ncbi.sh")
+    if code_match:
+        code = code_match.group(1)
+
+        # Save code
+        with open('scripts/filter_genomes_auto.py', 'w') as f:
+            f.write(code)
+
+        print("✓ Code extracted and saved")
+
+        # Execute code
+        print("\n[Step 4] Running the code...")
+        try:
+            exec(code)
+            print("✅ Code executed successfully!")
+
+            # Verify results
+            if os.path.exists('data/filtered_genomes/accession_list.txt'):
+                count = len(open('data/filtered_genomes/accession_list.txt').readlines())
+                print(f"\n✅ SUCCESS! Filtered {count} genomes")
+                print(f"   Files created:")
+                print(f"   - data/filtered_genomes/high_quality_genomes.tsv")
+                print(f"   - data/filtered_genomes/accession_list.txt")
+
+                if count > 0:
+                    print(f"\n🚀 Ready to download!")
+                    print(f"   Next: sbatch jobs/02_download_ncbi.sh")
+                else:
+                    print(f"\n⚠️  No genomes passed filter - asking AI to debug...")
             else:
-                print(f"\n⚠️  No genomes passed filter - asking AI to debug...")
-        else:
-            print("⚠️  Output files not created - something went wrong")
-            
-    except Exception as e:
-        print(f"❌ Error executing code: {e}")
-        print("\n🔄 Let me ask AI to fix this...")
-else:
-    print("⚠️  No Python code found in AI response")
-    print("Saving response for review...")
-    with open('results/ai_response.txt', 'w') as f:
-        f.write(solution)
-
-print("\n" + "="*70)
-print("🎉 Smart agent completed!")
-print("="*70)
+                print("⚠️  Output files not created - something went wrong")
+
+        except Exception as e:
+            print(f"❌ Error executing code: {e}")
+            print("\n🔄 Let me ask AI to fix this...")
+    else:
+        print("⚠️  No Python code found in AI response")
+        print("Saving response for review...")
+        save_report('ai_response.txt', solution)
+
+    print("\n" + "="*70)
+    print("🎉 Smart agent completed!")
+    print("="*70)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic project data at a multiple of the current scale
+
+Mirrors the /bigdata layout that create_rumino_manifest.py reads:
+    <out>/results_bins_gtkdb/<sample>/gtdbtk.bac120.summary.tsv
+    <out>/results_bins_checkm/<sample>/summary_table.tsv
+    <out>/results/<sample>/bins/<bin_id>.fa
+plus a header-less GTDB reference metadata table and a local NCBI-style
+FTP mirror (genomes/all/GCA/...) of gzipped reference genomes.
+
+Scale 1 matches the real project: 2,480 Ruminococcaceae bins in 94 samples.
+"""
+
+import argparse
+import gzip
+import os
+import random
+
+BASE_RUMINO_BINS = 2480
+BASE_SAMPLES = 94
+BASE_REFERENCE_GENOMES = 1000    # rows in the GTDB reference metadata
+BASE_MIRROR_GENOMES = 300        # accession_list.txt length
+OTHER_BINS_PER_RUMINO_BIN = 3    # non-Ruminococcaceae bins in each GTDB summary
+METADATA_COLUMNS = 113
+MAG_CONTIGS = 150                # generate_mags: ~3 Mb, a typical Ruminococcaceae MAG
+MAG_CONTIG_LENGTH = 20_000
+
+GENERA = ['UBA866', 'Anaerotruncus', 'Ruthenibacterium', 'JAGPHI01', 'Angelakisella',
+          'Massiliimalia', 'Hydrogenoanaerobacterium', 'Fournierella', 'Gemmiger', '']
+OTHER_FAMILIES = ['Lachnospiraceae', 'Oscillospiraceae', 'Bacteroidaceae', 'Enterobacteriaceae']
+
+SEQUENCE_POOL_SIZE = 1 << 20
+
+
+class SequencePool:
+    """Random DNA drawn once and sliced, so large FASTA sets write quickly"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.pool = ''.join(rng.choices('ACGT', k=SEQUENCE_POOL_SIZE))
+
+    def sequence(self, length):
+        start = self.rng.randrange(0, SEQUENCE_POOL_SIZE - length)
+        return self.pool[start:start + length]
+
+
+def write_fasta(path, contigs, line_width=80, compress=False):
+    """Write (name, sequence) pairs as a wrapped FASTA file"""
+    opener = gzip.open if compress else open
+    with opener(path, 'wt') as f:
+        for name, seq in contigs:
+            f.write(f">{name}\n")
+            for i in range(0, len(seq), line_width):
+                f.write(seq[i:i + line_width] + '\n')
+
+
+def rumino_classification(genus):
+    return ("d__Bacteria;p__Bacillota_A;c__Clostridia;o__Oscillospirales;"
+            f"f__Ruminococcaceae;g__{genus};s__")
+
+
+def other_classification(rng):
+    family = rng.choice(OTHER_FAMILIES)
+    return f"d__Bacteria;p__Bacillota_A;c__Clostridia;o__;f__{family};g__;s__"
+
+
+def generate_bins(out_dir, scale, rng, fasta=True, contigs_per_bin=3, contig_length=1500):
+    """Write GTDB-Tk summaries, CheckM tables and MAG FASTA files"""
+    n_rumino = round(BASE_RUMINO_BINS * scale)
+    n_samples = max(1, round(BASE_SAMPLES * scale))
+    pool = SequencePool(rng) if fasta else None
+
+    for s in range(n_samples):
+        sample_id = f"SYN{s:06d}.{10000 + s}"
+        gtdb_dir = f"{out_dir}/results_bins_gtkdb/{sample_id}"
+        checkm_dir = f"{out_dir}/results_bins_checkm/{sample_id}"
+        bins_dir = f"{out_dir}/results/{sample_id}/bins"
+        for d in (gtdb_dir, checkm_dir, bins_dir):
+            os.makedirs(d, exist_ok=True)
+
+        # Spread the Ruminococcaceae bins evenly over samples
+        n_here = n_rumino // n_samples + (1 if s < n_rumino % n_samples else 0)
+        n_other = n_here * OTHER_BINS_PER_RUMINO_BIN
+
+        gtdb_rows = []
+        checkm_rows = []
+        for b in range(n_here + n_other):
+            bin_id = f"{sample_id}_R.bin.{b + 1}"
+            is_rumino = b < n_here
+            classification = (rumino_classification(rng.choice(GENERA)) if is_rumino
+                              else other_classification(rng))
+            gtdb_rows.append(f"{bin_id}\t{classification}\tN/A\tN/A\ttaxonomic classification\tN/A")
+
+            completeness = round(rng.uniform(10, 100), 2)
+            contamination = round(rng.expovariate(1 / 3), 2)
+            checkm_rows.append(f"{bin_id}\to__Clostridiales (UID1212)\t263\t149\t"
+                               f"{completeness}\t{contamination}\t0.0")
+
+            if is_rumino and fasta:
+                contigs = [(f"{bin_id}_k141_{c}", pool.sequence(contig_length))
+                           for c in range(contigs_per_bin)]
+                write_fasta(f"{bins_dir}/{bin_id}.fa", contigs)
+
+        with open(f"{gtdb_dir}/gtdbtk.bac120.summary.tsv", 'w') as f:
+            f.write("user_genome\tclassification\tfastani_reference\tfastani_ani\t"
+                    "classification_method\tnote\n")
+            f.write('\n'.join(gtdb_rows) + '\n')
+        with open(f"{checkm_dir}/summary_table.tsv", 'w') as f:
+            f.write("Bin Id\tMarker lineage\t# genomes\t# markers\tCompleteness\t"
+                    "Contamination\tStrain heterogeneity\n")
+            f.write('\n'.join(checkm_rows) + '\n')
+
+    return n_rumino, n_samples
+
+
+def generate_mags(out_dir, n, rng, contigs=MAG_CONTIGS, mean_contig_length=MAG_CONTIG_LENGTH):
+    """Write n full-size MAGs (<out>/<mag_id>.fa) with varied contig lengths; returns id -> path"""
+    os.makedirs(out_dir, exist_ok=True)
+    pool = SequencePool(rng)
+    paths = {}
+    for m in range(n):
+        mag_id = f"SYNMAG{m:05d}"
+        lengths = [rng.randint(mean_contig_length // 4, mean_contig_length * 7 // 4)
+                   for _ in range(contigs)]
+        paths[mag_id] = f"{out_dir}/{mag_id}.fa"
+        write_fasta(paths[mag_id], [(f"{mag_id}_k141_{c}", pool.sequence(length))
+                                    for c, length in enumerate(lengths)])
+    return paths
+
+
+def reference_accessions(n, rng):
+    """GTDB-style accessions (GB_GCA_/RS_GCF_) with unique numbers"""
+    numbers = rng.sample(range(1_000_000, 999_999_999), n)
+    accessions = []
+    for number in numbers:
+        prefix = 'RS_GCF' if rng.random() < 0.18 else 'GB_GCA'
+        accessions.append(f"{prefix}_{number:09d}.1")
+    return accessions
+
+
+def generate_reference_metadata(out_dir, scale, rng):
+    """Write a header-less GTDB metadata table (accession, -, completeness, contamination, ...)"""
+    n = round(BASE_REFERENCE_GENOMES * scale)
+    os.makedirs(f"{out_dir}/reference_genomes", exist_ok=True)
+    path = f"{out_dir}/reference_genomes/ruminococcaceae_metadata.tsv"
+    accessions = reference_accessions(n, rng)
+    with open(path, 'w') as f:
+        for accession in accessions:
+            row = [accession, '0', str(round(rng.uniform(50, 100), 2)),
+                   str(round(rng.expovariate(1 / 2), 2))]
+            row.append(rumino_classification(rng.choice(GENERA)))
+            row += ['none'] * (METADATA_COLUMNS - len(row))
+            f.write('\t'.join(row) + '\n')
+    return path, accessions
+
+
+def ncbi_path(accession):
+    """genomes/all/... directory and file name for a GTDB accession"""
+    clean = accession.split('_', 1)[1]               # GCA_018379485.1
+    prefix, rest = clean.split('_')
+    number = rest.split('.')[0]
+    assembly = f"{clean}_ASM{number[-7:]}v1"
+    directory = f"genomes/all/{prefix}/{number[0:3]}/{number[3:6]}/{number[6:9]}/{assembly}"
+    return directory, f"{assembly}_genomic.fna.gz"
+
+
+def generate_ncbi_mirror(out_dir, accessions, scale, rng, contig_length=5000):
+    """Write gzipped genomes in NCBI FTP layout for the first N accessions"""
+    n = min(len(accessions), round(BASE_MIRROR_GENOMES * scale))
+    chosen = accessions[:n]
+    pool = SequencePool(rng)
+    for accession in chosen:
+        directory, filename = ncbi_path(accession)
+        os.makedirs(f"{out_dir}/ncbi_mirror/{directory}", exist_ok=True)
+        write_fasta(f"{out_dir}/ncbi_mirror/{directory}/{filename}",
+                    [(f"{accession}_contig_{c}", pool.sequence(contig_length)) for c in range(3)],
+                    compress=True)
+
+    os.makedirs(f"{out_dir}/filtered_genomes", exist_ok=True)
+    with open(f"{out_dir}/filtered_genomes/accession_list.txt", 'w') as f:
+        f.write('\n'.join(chosen) + '\n')
+    return chosen
+
+
+def generate_project(out_dir, scale=1.0, seed=42, fasta=True,
+                     contigs_per_bin=3, contig_length=1500):
+    """Generate the full synthetic tree and return a summary dict"""
+    rng = random.Random(seed)
+    n_bins, n_samples = generate_bins(out_dir, scale, rng, fasta=fasta,
+                                      contigs_per_bin=contigs_per_bin,
+                                      contig_length=contig_length)
+    metadata_path, accessions = generate_reference_metadata(out_dir, scale, rng)
+    mirrored = generate_ncbi_mirror(out_dir, accessions, scale, rng)
+    return {
+        'out_dir': out_dir,
+        'scale': scale,
+        'rumino_bins': n_bins,
+        'samples': n_samples,
+        'reference_genomes': len(accessions),
+        'mirrored_genomes': len(mirrored),
+        'metadata_path': metadata_path,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Ruminococcaceae project data")
+    parser.add_argument('out_dir')
+    parser.add_argument('--scale', type=float, default=10, help="multiple of the current 2,480 bins")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-fasta', action='store_true', help="skip writing MAG FASTA files")
+    parser.add_argument('--contigs-per-bin', type=int, default=3)
+    parser.add_argument('--contig-length', type=int, default=1500)
+    args = parser.parse_args()
+
+    print(f"🧬 Generating synthetic data at {args.scale}x scale in {args.out_dir}...")
+    summary = generate_project(args.out_dir, args.scale, args.seed, fasta=not args.no_fasta,
+                               contigs_per_bin=args.contigs_per_bin,
+                               contig_length=args.contig_length)
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,10 @@
 """Test that all API connections work"""
 
 import os
-from dotenv import load_dotenv
+from multi_ai_agent import load_api_keys
 
 # Load API keys
-load_dotenv('configs/api_keys.env')
+load_api_keys()
 
 print("=" * 50)
 print("Testing Ruminococcaceae Agent Setup")
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modules in scripts/ import each other by name, as when run from there
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
@@ -0,0 +1,133 @@
+"""
+Batch results must land on the manifest row whose query produced them
+
+Runs batch_interpretation.py against the fake server's Message Batches
+stub: submit in one process, resume in another, then check each TSV row
+against the stub answer for that row's own query.
+"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import SCRIPTS_DIR
+from fake_llm_server import FakeLLMConfig, FakeLLMServer, fake_text
+
+pytest.importorskip('anthropic')
+pytest.importorskip('dotenv')
+
+from batch_interpretation import write_results  # noqa: E402
+
+FIELDS = ['bin_id', 'sample_id', 'classification', 'Completeness', 'Contamination']
+ROWS = [
+    ('S1.1_R.bin.1', 'S1.1', 'g__Gemmiger', '98.1', '0.4'),
+    ('S1_1_R.bin.1', 'S1_1', 'g__Gemmiger', '95.0', '1.2'),    # same custom_id once sanitized
+    ('S2.7_R.bin.3', 'S2.7', 'g__UBA866', '92.3', '2.0'),
+    ('S3.2_R.bin.9', 'S3.2', 'g__', '91.0', '0.0'),             # unclassified genus
+]
+
+
+@pytest.fixture
+def server():
+    with FakeLLMServer(FakeLLMConfig(batch_delay=0.5, response_tokens=40)) as server:
+        yield server
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    path = tmp_path / 'manifest.tsv'
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter='\t')
+        writer.writerow(FIELDS)
+        for bin_id, sample_id, genus, completeness, contamination in ROWS:
+            writer.writerow([bin_id, sample_id, f"d__Bacteria;f__Ruminococcaceae;{genus};s__",
+                             completeness, contamination])
+    return path
+
+
+def run_batch(tmp_path, server, *args):
+    """batch_interpretation.py in its own process, with relative paths under tmp_path"""
+    env = dict(os.environ, ANTHROPIC_BASE_URL=server.url, GEMINI_BASE_URL=server.url,
+               ANTHROPIC_API_KEY='stub', GOOGLE_API_KEY='stub')
+    proc = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'batch_interpretation.py'),
+                           '--task-type', 'analysis', '--poll', '0.1', *args],
+                          cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout
+
+
+def stub_answer(query, n_tokens=40):
+    """What the stub returns for an 'analysis' query"""
+    return fake_text(json.dumps([{"role": "user", "content": query}]), n_tokens)
+
+
+def read_tsv(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f, delimiter='\t'))
+
+
+@pytest.mark.parametrize('by', ['mag', 'genus'])
+def test_submit_then_resume(tmp_path, server, manifest, by):
+    run_batch(tmp_path, server, '--by', by, '--manifest', str(manifest), '--submit-only')
+    (state_file,) = os.listdir(tmp_path / 'logs' / 'batches')
+    batch_id = state_file[:-len('.json')]
+
+    run_batch(tmp_path, server, '--resume', batch_id)
+    assert server.calls['anthropic.batches.create'] == 1
+
+    with open(tmp_path / 'logs' / 'batches' / state_file) as f:
+        state = json.load(f)
+    rows = read_tsv(tmp_path / 'results' / f"{by}_interpretations.tsv")
+    assert len(rows) == len(state['id_map'])
+    answers = {custom_id: stub_answer(query) for custom_id, query in state['queries'].items()}
+
+    if by == 'mag':
+        assert sorted(state['id_map']) == ['S1_1_R_bin_1', 'S1_1_R_bin_1_2', 'S2_7_R_bin_3', 'S3_2_R_bin_9']
+        for row in rows:
+            custom_id, = [cid for cid, item in state['id_map'].items() if item['bin_ids'] == [row['bin_id']]]
+            assert row['bin_id'] in state['queries'][custom_id]
+            assert row['interpretation'] == answers[custom_id]
+            assert row['truncated'] == 'no'
+        assert {row['bin_id']: row['genus'] for row in rows} == {
+            'S1.1_R.bin.1': 'Gemmiger', 'S1_1_R.bin.1': 'Gemmiger',
+            'S2.7_R.bin.3': 'UBA866', 'S3.2_R.bin.9': 'unclassified'}
+    else:
+        by_genus = {row['genus']: row for row in rows}
+        assert by_genus['Gemmiger']['bin_ids'] == 'S1.1_R.bin.1,S1_1_R.bin.1'
+        assert by_genus['Gemmiger']['n_mags'] == '2'
+        for custom_id, item in state['id_map'].items():
+            assert f"genus: {item['genus']}" in state['queries'][custom_id]
+            assert by_genus[item['genus']]['interpretation'] == answers[custom_id]
+
+
+def test_truncated_answers_are_flagged(tmp_path, server, manifest, monkeypatch):
+    for name, value in {'ANTHROPIC_BASE_URL': server.url, 'ANTHROPIC_API_KEY': 'stub',
+                        'GOOGLE_API_KEY': 'stub'}.items():
+        monkeypatch.setenv(name, value)
+    from batch_interpretation import load_manifest, mag_queries
+    from multi_ai_agent import MultiAIAgent
+
+    queries, id_map = mag_queries(load_manifest(str(manifest)))
+    agent = MultiAIAgent()
+    agent.hooks = []
+    # The stub answers 40 words, so a 40-token limit is enough and 10 is not
+    first, *rest = queries
+    short = agent.submit_batch('analysis', {first: queries[first]}, max_tokens=10)
+    full = agent.submit_batch('analysis', {k: queries[k] for k in rest}, max_tokens=40)
+
+    stop_reasons, results = {}, {}
+    for batch_id in (short, full):
+        agent.wait_for_batch(batch_id, poll_interval=0.1)
+        results.update(agent.batch_results(batch_id, stop_reasons=stop_reasons))
+    assert stop_reasons[first] == 'max_tokens'
+    assert all(stop_reasons[k] == 'end_turn' for k in rest)
+
+    output = tmp_path / 'out.tsv'
+    write_results({'by': 'mag', 'id_map': id_map}, results, str(output), stop_reasons)
+    flagged = {row['bin_id']: row['truncated'] for row in read_tsv(output)}
+    assert flagged == {item['bin_ids'][0]: 'yes' if custom_id == first else 'no'
+                       for custom_id, item in id_map.items()}
@@ -0,0 +1,89 @@
+"""
+Offsets in build_fai must match what a plain parse of the FASTA gives
+
+Each case writes the same contigs in a different layout and checks every
+fetch against the sequence read straight from the text.
+"""
+
+import gzip
+import random
+
+import pytest
+
+from fasta_index import IndexedFasta, build_fai
+
+CONTIGS = [('k141_1', 245), ('k141_2', 160), ('k141_3', 7), ('k141_4', 1)]
+
+
+def contig_sequences(seed=1):
+    rng = random.Random(seed)
+    return [(name, ''.join(rng.choices('ACGT', k=length))) for name, length in CONTIGS]
+
+
+def fasta_text(contigs, width=60, newline='\n', blank_after=False):
+    lines = []
+    for name, seq in contigs:
+        lines.append(f">{name} length={len(seq)}")
+        lines += [seq[i:i + width] for i in range(0, len(seq), width)]
+        if blank_after:
+            lines.append('')
+    return newline.join(lines) + newline
+
+
+def check_fetches(fasta, contigs):
+    assert fasta.contigs == [name for name, _ in contigs]
+    for name, seq in contigs:
+        assert fasta.length(name) == len(seq)
+        assert fasta.fetch(name).decode() == seq
+        for start, end in [(0, 1), (5, 70), (59, 61), (60, 120), (len(seq) - 1, len(seq))]:
+            if end <= len(seq):
+                assert fasta.fetch(name, start, end).decode() == seq[start:end]
+
+
+@pytest.mark.parametrize('layout', [
+    {'width': 60},                          # wrapped, short last line
+    {'width': 80},
+    {'width': 5},                           # exact multiple for k141_1
+    {'width': 1000},                        # one line per contig
+    {'width': 60, 'newline': '\r\n'},
+    {'width': 60, 'blank_after': True},
+])
+def test_fetch_matches_plain_parse(tmp_path, layout):
+    contigs = contig_sequences()
+    path = tmp_path / 'bin.fa'
+    path.write_bytes(fasta_text(contigs, **layout).encode())
+
+    fasta = IndexedFasta(str(path), cache_dir=str(tmp_path / 'cache'))
+    check_fetches(fasta, contigs)
+    fasta.close()
+
+
+def test_gzip_input(tmp_path):
+    contigs = contig_sequences()
+    path = tmp_path / 'GCA_000000001.1_genomic.fna.gz'
+    with gzip.open(path, 'wt') as f:
+        f.write(fasta_text(contigs, width=70))
+
+    fasta = IndexedFasta(str(path), key='GCA_000000001.1', cache_dir=str(tmp_path / 'cache'))
+    assert fasta.path == str(tmp_path / 'cache' / 'GCA_000000001.1.fa')
+    check_fetches(fasta, contigs)
+    fasta.close()
+
+
+def test_offsets_and_line_widths(tmp_path):
+    path = tmp_path / 'bin.fa'
+    path.write_bytes(b">a desc\r\nACGT\r\nAC\r\n>b\r\nGG\r\n")
+    entries = build_fai(str(path))
+    assert [tuple(e) for e in entries] == [('a', 6, 9, 4, 6), ('b', 2, 23, 2, 4)]
+
+
+@pytest.mark.parametrize('text', [
+    ">a\nACGT\n\nACGT\n",        # blank line inside a record
+    ">a\nACGT\nAC\nACGT\n",      # short line before the last
+    ">a\nACGT\nACGTA\n",         # line longer than the first
+])
+def test_uneven_lines_rejected(tmp_path, text):
+    path = tmp_path / 'bin.fa'
+    path.write_text(text)
+    with pytest.raises(ValueError, match='uneven line lengths'):
+        build_fai(str(path))
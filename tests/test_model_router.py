@@ -0,0 +1,50 @@
+"""
+Hedging deadlines and the latency windows they are computed from
+"""
+
+import time
+
+from model_router import MIN_DEADLINE, ModelRouter, RequestCancelled
+
+PRIMARY = ('anthropic', 'claude')
+SECONDARY = ('gemini', 'gemini')
+
+
+def test_stragglers_do_not_set_the_deadline():
+    router = ModelRouter()
+    for i in range(20):
+        router.record(PRIMARY, 3.0 if i % 12 == 0 else 0.3, True)
+    assert router.deadline(PRIMARY) == MIN_DEADLINE
+
+
+def test_cancelled_loser_is_a_censored_sample():
+    router = ModelRouter()
+    for _ in range(10):
+        router.record(PRIMARY, 0.2, True)
+
+    def call(route, cancel):
+        if route == SECONDARY:
+            return 'hedge'
+        cancel.wait(5)
+        raise RequestCancelled('closed')
+
+    assert router.run(PRIMARY, SECONDARY, call, log=lambda *args: None) == 'hedge'
+    latencies = router.stats[PRIMARY].latencies
+    for _ in range(50):
+        if len(latencies) == 11:
+            break
+        time.sleep(0.01)
+    assert latencies[-1] >= MIN_DEADLINE
+    assert router.stats[PRIMARY].error_rate == 0.0
+
+
+def test_cache_hits_are_not_timed():
+    router = ModelRouter()
+
+    def call(route, cancel):
+        cancel.cache_hit = True
+        return 'stored answer'
+
+    assert router.run(PRIMARY, SECONDARY, call) == 'stored answer'
+    assert not router.stats[PRIMARY].latencies
+    assert not router.stats[PRIMARY].outcomes
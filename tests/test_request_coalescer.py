@@ -0,0 +1,209 @@
+"""
+Identical concurrent requests must reach the fake LLM server only once
+
+The RequestCoalescer tests need nothing beyond the standard library; the
+MultiAIAgent tests also need the provider SDKs and are skipped without them.
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+fcntl = pytest.importorskip('fcntl')
+
+from conftest import SCRIPTS_DIR
+from fake_llm_server import FakeLLMConfig, FakeLLMServer
+from request_coalescer import RequestCoalescer, request_key
+
+N_THREADS = 16
+N_PROCESSES = 4
+
+
+def ask_stub(url, prompt):
+    """One non-streaming Anthropic-style request to the fake server"""
+    body = json.dumps({"model": "stub", "max_tokens": 100,
+                       "messages": [{"role": "user", "content": prompt}]}).encode()
+    request = urllib.request.Request(f"{url}/v1/messages", data=body,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)['content'][0]['text']
+
+
+@pytest.fixture
+def server():
+    with FakeLLMServer(FakeLLMConfig(latency=1.0)) as server:
+        yield server
+
+
+@pytest.fixture
+def stub_env(tmp_path, server, monkeypatch):
+    """Environment for agents/subprocesses: fake server, everything under tmp_path"""
+    env = {
+        'ANTHROPIC_BASE_URL': server.url, 'GEMINI_BASE_URL': server.url,
+        'ANTHROPIC_API_KEY': 'stub', 'GOOGLE_API_KEY': 'stub',
+        'AGENT_COALESCE_DIR': str(tmp_path / 'inflight'),
+        'RESULTS_DB': str(tmp_path / 'results.db'),
+        'AGENT_CALL_LOG': str(tmp_path / 'agent_calls.jsonl'),
+    }
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return env
+
+
+async def gather_concurrently(coroutines):
+    """Gather with enough worker threads that every to_thread call starts at once"""
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=N_THREADS))
+    return await asyncio.gather(*coroutines)
+
+
+def run_processes(code, env, n=N_PROCESSES):
+    """Start n copies of `code` together; returns the last stdout line of each"""
+    procs = [subprocess.Popen([sys.executable, '-c', code], cwd=SCRIPTS_DIR, env=dict(os.environ, **env),
+                              stdout=subprocess.PIPE, text=True)
+             for _ in range(n)]
+    outputs = [proc.communicate(timeout=60)[0] for proc in procs]
+    assert [proc.returncode for proc in procs] == [0] * n
+    return [output.strip().splitlines()[-1] for output in outputs]
+
+
+# -- RequestCoalescer -----------------------------------------------------
+
+def test_threads_share_one_call(tmp_path, server):
+    coalescer = RequestCoalescer(str(tmp_path))
+    key = request_key('stub', 'shared question')
+    with ThreadPoolExecutor(max_workers=N_THREADS) as pool:
+        results = list(pool.map(lambda _: coalescer.run(key, lambda: ask_stub(server.url, 'shared question')),
+                                range(N_THREADS)))
+
+    assert server.calls['anthropic.messages'] == 1
+    assert len({answer for answer, _ in results}) == 1
+    assert sum(1 for _, shared in results if not shared) == 1
+
+
+def test_asyncio_tasks_share_one_call(tmp_path, server):
+    coalescer = RequestCoalescer(str(tmp_path))
+    key = request_key('stub', 'async question')
+
+    results = asyncio.run(gather_concurrently(
+        asyncio.to_thread(coalescer.run, key, lambda: ask_stub(server.url, 'async question'))
+        for _ in range(8)
+    ))
+    assert server.calls['anthropic.messages'] == 1
+    assert len({answer for answer, _ in results}) == 1
+
+
+def test_processes_share_one_call(tmp_path, server):
+    code = (
+        "import sys; sys.path.insert(0, %r)\n"
+        "from request_coalescer import RequestCoalescer, request_key\n"
+        "from test_request_coalescer import ask_stub\n"
+        "answer, shared = RequestCoalescer(%r).run(request_key('stub', 'process question'),\n"
+        "    lambda: ask_stub(%r, 'process question'))\n"
+        "print(answer)\n"
+    ) % (os.path.dirname(os.path.abspath(__file__)), str(tmp_path), server.url)
+    answers = run_processes(code, {})
+
+    assert server.calls['anthropic.messages'] == 1
+    assert len(set(answers)) == 1
+
+
+def test_finished_calls_are_not_reused(tmp_path, server):
+    key = request_key('stub', 'repeated question')
+    ask = lambda: ask_stub(server.url, 'repeated question')
+
+    coalescer = RequestCoalescer(str(tmp_path))
+    _, shared_first = coalescer.run(key, ask)
+    _, shared_again = coalescer.run(key, ask)
+    # A new process (new coalescer) finds the old result file but did not wait for it
+    _, shared_new_process = RequestCoalescer(str(tmp_path)).run(key, ask)
+
+    assert server.calls['anthropic.messages'] == 3
+    assert not (shared_first or shared_again or shared_new_process)
+
+
+def test_failed_leader_does_not_block_waiters(tmp_path, server):
+    coalescer = RequestCoalescer(str(tmp_path))
+    key = request_key('stub', 'failing question')
+
+    def fail():
+        raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        coalescer.run(key, fail)
+    answer, shared = coalescer.run(key, lambda: ask_stub(server.url, 'failing question'))
+    assert answer.startswith('[stub') and not shared
+
+
+# -- MultiAIAgent ---------------------------------------------------------
+
+@pytest.fixture
+def agent(stub_env):
+    pytest.importorskip('anthropic')
+    pytest.importorskip('dotenv')
+    from agent_metrics import CallLog
+    from model_router import ModelRouter
+    from multi_ai_agent import MultiAIAgent
+    from results_store import ResultsStore
+
+    agent = MultiAIAgent()
+    # Module-level defaults were read at import; point them at tmp_path too
+    agent.hooks = [CallLog(stub_env['AGENT_CALL_LOG'])]
+    agent.coalescer = RequestCoalescer(stub_env['AGENT_COALESCE_DIR'])
+    agent.router = ModelRouter()
+    agent._store = ResultsStore(stub_env['RESULTS_DB'])
+    yield agent
+    agent.store.close()
+
+
+def test_agent_threads_share_one_call(agent, server):
+    query = "Shared Lachnospiraceae comparison"
+    with ThreadPoolExecutor(max_workers=N_THREADS) as pool:
+        answers = list(pool.map(lambda _: agent.analyze_ruminococcaceae('bioinformatics', query, verbose=False),
+                                range(N_THREADS)))
+
+    assert server.calls['anthropic.messages'] == 1
+    assert len(set(answers)) == 1
+
+
+def test_agent_asyncio_tasks_share_one_call(agent, server):
+    answers = asyncio.run(gather_concurrently(
+        agent.analyze_ruminococcaceae_async('analysis', "Shared diversity question")
+        for _ in range(8)
+    ))
+    assert server.calls['anthropic.messages'] == 1
+    assert len(set(answers)) == 1
+
+
+def test_agent_processes_share_one_call(agent, server, stub_env):
+    code = (
+        "from multi_ai_agent import MultiAIAgent\n"
+        "answer = MultiAIAgent().analyze_ruminococcaceae('bioinformatics', 'Shared pipeline question',\n"
+        "                                               verbose=False)\n"
+        "print(answer.replace('\\n', ' '))\n"
+    )
+    answers = run_processes(code, stub_env)
+
+    assert server.calls['anthropic.messages'] == 1
+    assert len(set(answers)) == 1
+
+
+def test_prune_removes_old_files_but_not_held_locks(tmp_path, server):
+    coalescer = RequestCoalescer(str(tmp_path))
+    coalescer.run(request_key('stub', 'old'), lambda: ask_stub(server.url, 'old'))
+    held = open(tmp_path / 'held.lock', 'a')
+    fcntl.flock(held, fcntl.LOCK_EX)
+    try:
+        old = time.time() - 3600
+        for path in tmp_path.iterdir():
+            os.utime(path, (old, old))
+        coalescer.prune()
+        assert [path.name for path in tmp_path.iterdir()] == ['held.lock']
+    finally:
+        held.close()
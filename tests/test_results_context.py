@@ -0,0 +1,57 @@
+"""
+Earlier answers sent as context must not change what a request is keyed,
+stored or routed by
+"""
+
+import pytest
+
+from fake_llm_server import FakeLLMConfig, FakeLLMServer
+
+pytest.importorskip('anthropic')
+pytest.importorskip('dotenv')
+
+QUERY = "Gemmiger butyrate production in herptile guts"
+
+
+@pytest.fixture
+def server():
+    with FakeLLMServer(FakeLLMConfig(latency=0.05)) as server:
+        yield server
+
+
+@pytest.fixture
+def agent(tmp_path, server, monkeypatch):
+    for name, value in {'ANTHROPIC_BASE_URL': server.url, 'GEMINI_BASE_URL': server.url,
+                        'ANTHROPIC_API_KEY': 'stub', 'GOOGLE_API_KEY': 'stub'}.items():
+        monkeypatch.setenv(name, value)
+    from model_router import ModelRouter
+    from multi_ai_agent import MultiAIAgent
+    from request_coalescer import RequestCoalescer
+    from results_store import ResultsStore
+
+    agent = MultiAIAgent()
+    agent.records = []
+    agent.hooks = [agent.records.append]
+    agent.coalescer = RequestCoalescer(str(tmp_path / 'inflight'))
+    agent.router = ModelRouter(fast_models={'anthropic': 'claude-fast'})
+    agent._store = ResultsStore(str(tmp_path / 'results.db'))
+    agent.reuse_results = agent.use_history = True
+    yield agent
+    agent.store.close()
+
+
+def test_context_is_sent_beside_the_query(agent, server):
+    agent.store.add_response("Gemmiger butyrate production in mammals",
+                             "An earlier answer about Gemmiger. " * 50, task_type='analysis')
+
+    first = agent.analyze_ruminococcaceae('analysis', QUERY, verbose=False)
+    assert server.calls['anthropic.messages'] == 1
+    # Short query, long context: the fast model still applies
+    assert agent.records[-1]['model'] == 'claude-fast'
+    (hit,) = [h for h in agent.store.search(QUERY) if agent.store.get(h['id'])['response'] == first]
+    assert agent.store.get(hit['id'])['prompt'] == QUERY
+
+    # The context now also holds the first answer, but the request is the same
+    assert agent.analyze_ruminococcaceae('analysis', QUERY, verbose=False) == first
+    assert server.calls['anthropic.messages'] == 1
+    assert agent.records[-1]['cache_hit']